@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+
+import re
+
+class Audit:
+    """rules over the top level items of game files, run in one pass
+
+    a rule is registered with the glob of the files it reads. item rules
+    are called as rule(result, *args, n, v) for each top level item whose
+    key fullmatches the regex keys, if given, and none of the regexes in
+    skip. file rules are called as rule(result, *args, tree) once per file.
+
+    run parses each file once and walks its top level once, dispatching
+    every item to all rules which are interested in it. all rules of a file
+    share its result, a dict used as an ordered set of findings.
+    """
+
+    def __init__(self):
+        # glob to ([file rules], [(item rule, keys match, skip match)])
+        self.rules = {}
+
+    def _rules(self, glob):
+        return self.rules.setdefault(glob, ([], []))
+
+    def rule(self, glob, keys=None, skip=()):
+        """return a decorator which registers an item rule"""
+        keys = re.compile(keys).fullmatch if keys is not None else None
+        skip = (re.compile('|'.join('(?:{})'.format(p) for p in skip))
+                .fullmatch if skip else None)
+        def register(f):
+            self._rules(glob)[1].append((f, keys, skip))
+            return f
+        return register
+
+    def file_rule(self, glob):
+        """return a decorator which registers a file rule"""
+        def register(f):
+            self._rules(glob)[0].append(f)
+            return f
+        return register
+
+    @staticmethod
+    def folder(glob):
+        """return (the folder of glob, how many path parts it matches)"""
+        parts = glob.split('/')
+        depth = next(i for i, p in enumerate(parts) if '*' in p)
+        return '/'.join(parts[:depth]), len(parts) - depth
+
+    def run(self, parser, *args):
+        """return a dict of each folder to a dict of the path of each file
+        with findings, relative to the folder, to its findings"""
+        results = {}
+        for glob, (file_rules, item_rules) in self.rules.items():
+            folder, depth = self.folder(glob)
+            folder_results = results.setdefault(folder, {})
+            for path, tree in parser.parse_files(glob):
+                result = {}
+                for f in file_rules:
+                    f(result, *args, tree)
+                for n, v in tree:
+                    for f, keys, skip in item_rules:
+                        if ((keys is None or keys(n.val)) and
+                                (skip is None or not skip(n.val))):
+                            f(result, *args, n, v)
+                if result:
+                    folder_results['/'.join(path.parts[-depth:])] = result
+        return results
@@ -3,9 +3,40 @@
 from pathlib import Path
 import sys
 import numpy as np
-from PIL import Image
-from .ck2parser import rootpath, SimpleParser
+from .ck2parser import (rootpath, cachedir, is_codename, get_provinces,
+                        SimpleParser)
 from .print_time import print_time
+from .provincemap import MapAssets, border_masks, border_image
+
+def de_jure_lieges(parser):
+    """return a dict of each county to its de jure (duchy, kingdom)"""
+    lieges = {}
+    def walk(tree, duchy=None, kingdom=None):
+        for n, v in tree:
+            if not is_codename(n.val):
+                continue
+            if n.val.startswith('e_'):
+                walk(v)
+            elif n.val.startswith('k_'):
+                walk(v, kingdom=n.val)
+            elif n.val.startswith('d_'):
+                walk(v, n.val, kingdom)
+            elif n.val.startswith('c_'):
+                lieges[n.val] = duchy, kingdom
+    for _, tree in parser.parse_files('common/landed_titles/*.txt'):
+        walk(tree)
+    return lieges
+
+def group_lut(size, province_groups):
+    """return an int array of the group of each province id, numbered from
+    1 in order of the group names, and 0 for provinces without a group"""
+    names = {name for name in province_groups.values() if name is not None}
+    codes = {name: code for code, name in enumerate(sorted(names), 1)}
+    lut = np.zeros(size, np.int32)
+    for province, name in province_groups.items():
+        if name is not None and province < size:
+            lut[province] = codes[name]
+    return lut
 
 @print_time
 def main():
@@ -14,18 +45,34 @@ def main():
         parser.moddirs.append(Path(sys.argv[1]))
     default_tree = parser.parse_file('map/default.map')
     provinces_path = parser.file('map/' + default_tree['provinces'].val)
-    a = np.array(Image.open(str(provinces_path))) # provinces.bmp
-    n = np.pad(a, ((1, 0), (0, 0), (0, 0)), 'edge')[:-1] # shifted south 1 pixel
-    w = np.pad(a, ((0, 0), (1, 0), (0, 0)), 'edge')[:, :-1]  # shifted east 1 pixel
-    nw = np.pad(a, ((1, 0), (1, 0), (0, 0)), 'edge')[:-1, :-1]  # shifted both 1 pixel
-    b = np.zeros((a.shape[0], a.shape[1], 4), np.uint8)  # output RGBA
-    mask = np.any((a != n) | (a != w) | (a != nw), axis=2) # get boolean mask of border pixels
-    mask[np.nonzero(np.all(a == 0, axis=2))] = True
-    b[:, :, 3][mask] = 255 # set border pixel transparency to opaque
-    out_image = Image.fromarray(b)
+    definition_path = parser.file('map/' + default_tree['definitions'].val)
+    assets = MapAssets(cachedir / 'map_assets', provinces_path,
+                       definition_path)
     modnames = ''.join(x.name.lower() + '_' for x in parser.moddirs)
-    out_path = rootpath / (modnames + 'borderlayer.png')
-    out_image.save(str(out_path))
+    assets.border_image().save(str(rootpath / (modnames + 'borderlayer.png')))
+
+    # the borders of the title tiers and the coastline, in one pass
+    size = len(assets.stats.count)
+    lieges = de_jure_lieges(parser)
+    counties = {number: title for number, title, _ in get_provinces(parser)}
+    water = np.zeros(size, bool)
+    for n, v in default_tree:
+        if n.val == 'sea_zones':
+            i, j = (int(n2.val) for n2 in v)
+            water[i:j + 1] = True
+        elif n.val == 'major_rivers':
+            water[[n2.val for n2 in v if n2.val < size]] = True
+    luts = {
+        'county': group_lut(size, counties),
+        'duchy': group_lut(size, {number: lieges.get(title, (None,))[0]
+                                  for number, title in counties.items()}),
+        'kingdom': group_lut(size, {number: lieges.get(title, (None,) * 2)[1]
+                                    for number, title in counties.items()}),
+        'coastline': water
+    }
+    for level, mask in border_masks(assets.ids, luts).items():
+        out_path = rootpath / (modnames + 'borderlayer_' + level + '.png')
+        border_image(mask).save(str(out_path))
 
 if __name__ == '__main__':
     main()
@@ -4,10 +4,11 @@ from bisect import insort
 from collections import defaultdict, namedtuple
 from operator import attrgetter
 from pathlib import Path
-from intervaltree import Interval, IntervalTree
+import numpy as np
 from .ck2parser import (rootpath, vanilladir, is_codename, TopLevel, Number,
                        Pair, Obj, Date as ASTDate, Comment, SimpleParser,
                        FullParser)
+from .intervals import BEGINNING, END, Intervals
 from .print_time import print_time
 
 CHECK_LIEGE_CONSISTENCY = True
@@ -42,6 +43,23 @@ class Date(namedtuple('Date', ['y', 'm', 'd'])):
                 y, m = y + 1, 1
         return Date(y, m, d)
 
+    def to_int(self):
+        """encode the date as an int in [BEGINNING, END], keeping the order"""
+        if self == Date.EARLIEST:
+            return BEGINNING
+        if self == Date.LATEST:
+            return END
+        return self.y * 10000 + self.m * 100 + self.d + 1
+
+    @classmethod
+    def from_int(cls, code):
+        if code == BEGINNING:
+            return Date.EARLIEST
+        if code == END:
+            return Date.LATEST
+        y, md = divmod(code - 1, 10000)
+        return cls(y, *divmod(md, 100))
+
 Date.EARLIEST = Date(float('-inf'), float('-inf'), float('-inf'))
 Date.LATEST = Date(float('inf'), float('inf'), float('inf'))
 
@@ -270,30 +288,6 @@ class TitleHistory:
         path = folder / '{}.txt'.format(self.name)
         parser.write(self.tree, path)
 
-# for monkey patching Node.pop_greatest_child to fix issue 41
-# https://github.com/chaimleib/intervaltree/issues/41
-def intervaltree_patch_issue_41():
-    from intervaltree.node import Node
-    def pop_greatest_child(self):
-        if self.right_node:
-            greatest_child, self[1] = self[1].pop_greatest_child()
-            new_self = self.rotate()
-            for iv in set(new_self.s_center):
-                if iv.contains_point(greatest_child.x_center):
-                    new_self.s_center.remove(iv)
-                    greatest_child.add(iv)
-            return (greatest_child,
-                    new_self if new_self.s_center else new_self.prune())
-        x_centers = set(iv.end for iv in self.s_center)
-        x_centers.remove(max(x_centers))
-        x_centers.add(self.x_center)
-        new_x_center = max(x_centers)
-        child = Node(new_x_center, (iv for iv in self.s_center
-                                    if iv.contains_point(new_x_center)))
-        self.s_center -= child.s_center
-        return child, self if self.s_center else self[0]
-    Node.pop_greatest_child = pop_greatest_child
-
 def iv_to_str(iv, end=None):
     if end is not None:
         iv = iv, end
@@ -314,14 +308,28 @@ def iv_to_str(iv, end=None):
 def title_tier(title):
     return 'bcdke'.index(title[0])
 
-def prune_tree(ivt, date_filter, pred=None):
-    for filter_iv in date_filter:
-        if pred is None or pred(filter_iv):
-            ivt.chop(filter_iv.begin, filter_iv.end)
+def date_intervals(pairs):
+    """return the Intervals of entity 0 spanning each (begin, end) date"""
+    return Intervals([0] * len(pairs), [b.to_int() for b, _ in pairs],
+                     [e.to_int() for _, e in pairs])
+
+def prune(intervals, date_filter):
+    """return intervals without the dates covered by date_filter"""
+    return intervals.subtract(date_filter, 0)
+
+def interval_lists(intervals, names, value_names=None):
+    """return a list of (name, [(begin, end[, value name]), ...]) of the
+    entities of intervals, with the codes decoded to names and dates"""
+    result = {}
+    for entity, begin, end, value in intervals:
+        iv = Date.from_int(begin), Date.from_int(end)
+        if value_names is not None:
+            iv += value_names[value],
+        result.setdefault(names[entity], []).append(iv)
+    return list(result.items())
 
 @print_time
 def main():
-    intervaltree_patch_issue_41()
     simple_parser = SimpleParser(Path.cwd())
     if FORMAT_TITLE_HISTORY or CLEANUP_TITLE_HISTORY:
         history_parser = FullParser(Path.cwd())
@@ -348,43 +356,43 @@ def main():
                 stack.pop()
     for _, tree in simple_parser.parse_files('common/landed_titles/*.txt'):
         recurse(tree)
-    date_filter = IntervalTree()
+    date_filter = Intervals()
     if not CLEANUP_TITLE_HISTORY:
         if PRUNE_ALL_BUT_DATES:
             dates = [Date(*d) for d in PRUNE_ALL_BUT_DATES]
             dates.append(Date.LATEST)
-            date_filter.addi(Date.EARLIEST, dates[0])
-            for i in range(len(dates) - 1):
-                date_filter.addi(dates[i].get_next_day(), dates[i + 1])
+            date_filter = date_intervals(
+                [(Date.EARLIEST, dates[0])] +
+                [(dates[i].get_next_day(), dates[i + 1])
+                 for i in range(len(dates) - 1)]).merge(by_value=False)
         elif (PRUNE_UNEXECUTED_HISTORY or PRUNE_IMPOSSIBLE_STARTS or
             PRUNE_NONBOOKMARK_STARTS or PRUNE_NONERA_STARTS):
-            date_filter.addi(Date.EARLIEST, Date.LATEST)
+            date_filter = date_intervals([(Date.EARLIEST, Date.LATEST)])
             last_start_date = Date.EARLIEST
             for _, tree in simple_parser.parse_files('common/bookmarks/*'):
                 for _, v in tree:
                     date = Date(*v['date'].val)
                     if not PRUNE_NONERA_STARTS or v.has_pair('era', 'yes'):
-                        date_filter.chop(date, date.get_next_day())
+                        date_filter = date_filter.chop(
+                            date.to_int(), date.get_next_day().to_int())
                     last_start_date = max(date, last_start_date)
             if not PRUNE_NONBOOKMARK_STARTS and not PRUNE_NONERA_STARTS:
                 defines = simple_parser.parse_file('common/defines.txt')
                 first = Date(*defines['start_date'].val)
                 last = Date(*defines['last_start_date'].val)
-                date_filter.chop(first, last.get_next_day())
+                date_filter = date_filter.chop(first.to_int(),
+                                               last.get_next_day().to_int())
                 last_start_date = max(last, last_start_date)
                 if not PRUNE_IMPOSSIBLE_STARTS:
-                    date_filter.clear()
-                    date_filter.addi(last_start_date.get_next_day(),
-                                     Date.LATEST)
-    title_holders = defaultdict(IntervalTree)
-    title_unheld = defaultdict(
-        lambda: IntervalTree.from_tuples([(Date.EARLIEST, Date.LATEST)]))
-    title_lieges = defaultdict(IntervalTree)
-    title_lte_tier = []
-    char_titles = defaultdict(IntervalTree)
+                    date_filter = date_intervals(
+                        [(last_start_date.get_next_day(), Date.LATEST)])
+    # titles and characters are coded as ints for the interval columns,
+    # with 0 for no title or character
+    title_codes = {0: 0}
+    char_codes = {0: 0}
+    holder_rows = []
+    liege_rows = []
     char_life = {}
-    title_dead_holders = []
-    title_county_unheld = []
     for _, tree in simple_parser.parse_files('history/characters/*'):
         for n, v in tree:
             birth = next((Date(*n2.val) for n2, v2 in v
@@ -397,7 +405,6 @@ def main():
                 char_life[n.val] = birth, death
     for path, tree in history_parser.parse_files('history/titles/*'):
         title = path.stem
-        tier = title_tier(title)
         if not len(tree) > 0 or title not in landed_titles_index:
             if (title in landed_titles_index and
                 not (vanilladir / 'history/titles' / path.name).exists()):
@@ -474,157 +481,149 @@ def main():
         except TypeError:
             print(path)
             raise
-        dead_holders = []
-        county_unheld = []
-        holders = histories[title].attr['holder']
-        for i, (begin, holder) in enumerate(holders):
-            try:
-                end = holders[i + 1][0]
-            except IndexError:
-                end = Date.LATEST
-            if holder != 0:
-                birth, death = char_life.get(holder,
-                                             (Date.LATEST, Date.LATEST))
-                if begin < birth and death < end:
-                    if dead_holders and dead_holders[-1][1] == begin:
-                        dead_holders[-1] = dead_holders[-1][0], birth
-                    else:
-                        dead_holders.append((begin, birth))
-                    if dead_holders[-1][1] == death:
-                        dead_holders[-1] = dead_holders[-1][0], end
-                    else:
-                        dead_holders.append((death, end))
-                elif begin < birth or death < end:
-                    error_begin = death if birth <= begin < death else begin
-                    error_end = birth if begin < birth <= end else end
-                    if dead_holders and dead_holders[-1][1] == error_begin:
-                        dead_holders[-1] = dead_holders[-1][0], error_end
-                    else:
-                        dead_holders.append((error_begin, error_end))
-            elif title.startswith('c'):
-                if county_unheld and county_unheld[-1][1] == begin:
-                    county_unheld[-1] = county_unheld[-1][0], end
-                else:
-                    county_unheld.append((begin, end))
-            title_holders[title][begin:end] = holder
-            if holder != 0:
-                char_titles[holder][begin:end] = title
-                title_unheld[title].chop(begin, end)
-        lte_tier = IntervalTree()
-        lieges = histories[title].attr['liege']
-        for i, (begin, liege) in enumerate(lieges):
-            try:
-                end = lieges[i + 1][0]
-            except IndexError:
-                end = Date.LATEST
-            if liege != 0 and title_tier(liege) <= tier:
-                lte_tier[begin:end] = liege
-            title_lieges[title][begin:end] = liege
-        if lte_tier:
-            title_lte_tier.append((title, lte_tier))
-        if dead_holders:
-            dead_holders = IntervalTree.from_tuples(dead_holders)
-            title_dead_holders.append((title, dead_holders))
-        if county_unheld:
-            county_unheld = IntervalTree.from_tuples(county_unheld)
-            title_county_unheld.append((title, county_unheld))
+        code = title_codes.setdefault(title, len(title_codes))
+        for attr, codes, rows in [('holder', char_codes, holder_rows),
+                                  ('liege', title_codes, liege_rows)]:
+            values = histories[title].attr[attr]
+            for i, (begin, value) in enumerate(values):
+                try:
+                    end = values[i + 1][0]
+                except IndexError:
+                    end = Date.LATEST
+                rows.append((code, begin.to_int(), end.to_int(),
+                             codes.setdefault(value, len(codes))))
     # counties without title histories
-    for history in histories.values():
-        if not history.has_file and history.name.startswith('c'):
-            always = IntervalTree.from_tuples([(Date.EARLIEST, Date.LATEST)])
-            title_county_unheld.append((history.name, always))
+    unfiled_counties = [title_codes.setdefault(history.name, len(title_codes))
+                        for history in histories.values()
+                        if not history.has_file and
+                        history.name.startswith('c')]
+    titles = list(title_codes)
+    chars = list(char_codes)
+    holders = Intervals.from_rows(holder_rows)
+    lieges = Intervals.from_rows(liege_rows)
+    title_tiers = np.array([title_tier(t) if t else -1 for t in titles])
+    is_county = np.array([t != 0 and t.startswith('c') for t in titles])
+    has_file = np.array([t in histories and histories[t].has_file
+                         for t in titles])
+    held = holders.select(holders.value != 0)
+    unheld = held.gaps(np.arange(len(titles)))
+    # holders before their birth or after their death
+    lives = [char_life.get(char, (Date.LATEST, Date.LATEST))
+             for char in chars]
+    births = np.array([birth.to_int() for birth, _ in lives], np.int64)
+    deaths = np.array([death.to_int() for _, death in lives], np.int64)
+    dead_holders = Intervals.concatenate([
+        Intervals(held.entity, held.begin,
+                  np.minimum(births[held.value], held.end)),
+        Intervals(held.entity, np.maximum(deaths[held.value], held.begin),
+                  held.end)]).merge(by_value=False)
+    county_unheld = Intervals.concatenate([
+        holders.select((holders.value == 0) & is_county[holders.entity]),
+        Intervals(unfiled_counties, np.full(len(unfiled_counties), BEGINNING),
+                  np.full(len(unfiled_counties), END))
+    ]).merge(by_value=False)
+    lte_tier = lieges.select((lieges.value != 0) &
+                             (title_tiers[lieges.value] <=
+                              title_tiers[lieges.entity]))
     # possible todo: look for dead lieges,
     # even though redundant with dead holders
-    title_liege_errors = []
-    for title, lieges in title_lieges.items():
-        errors = []
-        for liege_begin, liege_end, liege in sorted(lieges):
-            # counties are always held by someone
-            if liege == 0 or liege.startswith('c'):
-                continue
-            liege_unhelds = IntervalTree(title_unheld[liege])
-            if not title.startswith('c'):
-                # don't care if liege is unheld when this title is also unheld
-                prune_tree(liege_unhelds, title_unheld[title])
-            for liege_unheld in liege_unhelds[liege_begin:liege_end]:
-                begin = max(liege_begin, liege_unheld.begin)
-                end = min(liege_end, liege_unheld.end)
-                if errors and errors[-1][1] == begin:
-                    errors[-1] = errors[-1][0], end
-                else:
-                    errors.append((begin, end))
-        if errors:
-            errors = IntervalTree.from_tuples(errors)
-            title_liege_errors.append((title, errors))
+    # counties are always held by someone
+    checked = lieges.select((lieges.value != 0) & ~is_county[lieges.value])
+    query, _, begin, end = unheld.join(checked.value, checked.begin,
+                                       checked.end)
+    liege_errors = Intervals(checked.entity[query], begin, end)
+    # don't care if liege is unheld when this title is also unheld
+    of_county = is_county[liege_errors.entity]
+    liege_errors = Intervals.concatenate([
+        liege_errors.select(of_county),
+        liege_errors.select(~of_county).subtract(unheld)
+    ]).merge(by_value=False)
     if CHECK_LIEGE_CONSISTENCY:
         liege_consistency_unamb = defaultdict(dict)
         liege_consistency_amb = defaultdict(dict)
-        for char, titles in char_titles.items():
-            liege_chars = IntervalTree()
-            for holder_begin, holder_end, title in titles:
-                # if char == 71823 and title == 'c_roma':
-                #     import pdb; pdb.set_trace()
-                lieges = title_lieges[title][holder_begin:holder_end]
-                for liege_begin, liege_end, liege in lieges:
-                    liege_begin = max(liege_begin, holder_begin)
-                    liege_end = min(liege_end, holder_end)
-                    if liege not in title_holders:
-                        liege_chars[liege_begin:liege_end] = 0, liege, title
-                        continue
-                    liege_holders = title_holders[liege][liege_begin:liege_end]
-                    for begin, end, liege_holder in liege_holders:
-                        begin = max(begin, liege_begin)
-                        end = min(end, liege_end)
-                        if liege == title:
-                            liege_holder = 0
-                        elif liege_holder == char:
-                            continue
-                        liege_chars[begin:end] = liege_holder, liege, title
-            prune_tree(liege_chars, date_filter)
-            if liege_chars:
-                liege_chars.split_overlaps()
-                items = defaultdict(
-                    lambda: defaultdict(lambda: defaultdict(list)))
-                for begin, end, (liege_holder, liege, title) in liege_chars:
-                    items[begin, end][liege_holder][liege].append(title)
-                for iv, liege_holders in items.items():
-                    if len(liege_holders) > 1:
-                        if (PRUNE_ALL_BUT_REGIONS and
-                            all(region not in title_djls.get(title, ())
-                                for _, ls in liege_holders.items()
-                                for l in ls
-                                for region in PRUNE_ALL_BUT_REGIONS) and
-                            all(region not in title_djls.get(title, ())
-                                for _, ls in liege_holders.items()
-                                for _, ts in ls.items() for t in ts
-                                for region in PRUNE_ALL_BUT_REGIONS)):
-                            continue
-                        tiers = [max(title_tier(title)
-                                     for _, titles in lieges.items()
-                                     for title in titles)
-                                 for _, lieges in liege_holders.items()]
-                        if tiers.count(max(tiers)) == 1:
-                            which_dict = liege_consistency_unamb
-                        else:
-                            which_dict = liege_consistency_amb
-                        which_dict[char][iv] = liege_holders
-    if date_filter:
-        for title, errors in reversed(title_liege_errors):
-            prune_tree(errors, date_filter)
-            if not errors:
-                title_liege_errors.remove((title, errors))
-        for title, errors in reversed(title_county_unheld):
-            prune_tree(errors, date_filter)
-            if not errors:
-                title_county_unheld.remove((title, errors))
-        for title, dead_holders in reversed(title_dead_holders):
-            prune_tree(dead_holders, date_filter)
-            if not dead_holders:
-                title_dead_holders.remove((title, dead_holders))
+        # the holder of the liege of each title of each character, as rows
+        # of liege_chars coded by their index into held_titles, liege_titles
+        # and liege_holders
+        query, row, begin, end = lieges.join(held.entity, held.begin,
+                                             held.end)
+        char = held.value[query]
+        title = held.entity[query]
+        liege = lieges.value[row]
+        no_holders = ~has_file[liege]
+        query, row, begin2, end2 = holders.join(
+            liege[~no_holders], begin[~no_holders], end[~no_holders])
+        liege_holder = holders.value[row]
+        # a title which is its own liege counts as having no liege holder
+        own_liege = liege[~no_holders][query] == title[~no_holders][query]
+        liege_holder[own_liege] = 0
+        other = own_liege | (liege_holder != char[~no_holders][query])
+        char = np.concatenate([char[no_holders],
+                               char[~no_holders][query][other]])
+        begin = np.concatenate([begin[no_holders], begin2[other]])
+        end = np.concatenate([end[no_holders], end2[other]])
+        held_titles = np.concatenate([title[no_holders],
+                                      title[~no_holders][query][other]])
+        liege_titles = np.concatenate([liege[no_holders],
+                                       liege[~no_holders][query][other]])
+        liege_holders = np.concatenate([np.zeros(no_holders.sum(), np.int64),
+                                        liege_holder[other]])
+        liege_chars = prune(Intervals(char, begin, end,
+                                      np.arange(len(char))), date_filter)
+        row, begin, end = liege_chars.split_overlaps()
+        record = liege_chars.value[row]
+        char = liege_chars.entity[row]
+        # the pieces of a character in one interval are consistent if they
+        # all have the same liege holder
+        order = np.lexsort((liege_holders[record], end, begin, char))
+        char, begin, end = char[order], begin[order], end[order]
+        record = record[order]
+        new_piece = np.ones(len(order), bool)
+        new_piece[1:] = ((char[1:] != char[:-1]) | (begin[1:] != begin[:-1]) |
+                         (end[1:] != end[:-1]))
+        piece = np.cumsum(new_piece) - 1
+        other_holder = np.zeros(len(order), bool)
+        other_holder[1:] = (~new_piece[1:] & (liege_holders[record][1:] !=
+                                              liege_holders[record][:-1]))
+        inconsistent = np.zeros(len(order), bool)
+        inconsistent[piece[other_holder]] = True
+        items = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
+        for i in np.flatnonzero(inconsistent[piece]):
+            r = record[i]
+            iv = Date.from_int(begin[i]), Date.from_int(end[i])
+            items[chars[char[i]], iv][chars[liege_holders[r]]][
+                titles[liege_titles[r]]].append(titles[held_titles[r]])
+        for (char, iv), liege_holders in items.items():
+            if (PRUNE_ALL_BUT_REGIONS and
+                all(region not in title_djls.get(l, ())
+                    for _, ls in liege_holders.items()
+                    for l in ls
+                    for region in PRUNE_ALL_BUT_REGIONS) and
+                all(region not in title_djls.get(t, ())
+                    for _, ls in liege_holders.items()
+                    for _, ts in ls.items() for t in ts
+                    for region in PRUNE_ALL_BUT_REGIONS)):
+                continue
+            tiers = [max(title_tier(title)
+                         for _, titles in lieges.items()
+                         for title in titles)
+                     for _, lieges in liege_holders.items()]
+            if tiers.count(max(tiers)) == 1:
+                which_dict = liege_consistency_unamb
+            else:
+                which_dict = liege_consistency_amb
+            which_dict[char][iv] = liege_holders
+    if len(date_filter):
+        liege_errors = prune(liege_errors, date_filter)
+        county_unheld = prune(county_unheld, date_filter)
+        dead_holders = prune(dead_holders, date_filter)
+    title_liege_errors = interval_lists(liege_errors, titles)
+    title_county_unheld = interval_lists(county_unheld, titles)
+    title_lte_tier = interval_lists(lte_tier, titles, titles)
+    title_dead_holders = interval_lists(dead_holders, titles)
     if LANDED_TITLES_ORDER:
         sort_key = lambda x: landed_titles_index[x[0]]
     else:
-        sort_key = lambda x: (x[1].begin(), landed_titles_index[x[0]])
+        sort_key = lambda x: (min(x[1])[0], landed_titles_index[x[0]])
     title_liege_errors.sort(key=sort_key)
     title_county_unheld.sort(key=sort_key)
     title_lte_tier.sort(key=sort_key)
@@ -1,18 +1,27 @@
 #!/usr/bin/env python3
 
+import array
 import collections
+import concurrent.futures
+import contextlib
 import csv
 from functools import total_ordering
+import gc
 import hashlib
+import io
+import itertools
+import mmap
 import operator
 import os
 import pathlib
 import pickle
 import re
+import struct
 import sys
 import time
 import traceback
-from funcparserlib.lexer import make_tokenizer, Token
+import zipfile
+from funcparserlib.lexer import make_tokenizer, Token, LexerError
 from funcparserlib.parser import (some, a, maybe, many, finished, skip,
                                   oneplus, forward_decl, NoParseError)
 from .localpaths import rootpath, vanilladir, cachedir
@@ -23,7 +32,22 @@ try:
 except ImportError:
     git_present = False
 
-VERSION = 3
+VERSION = 4
+
+# shared by every node without pre-comments until someone asks for the list
+NO_COMMENTS = ()
+
+@contextlib.contextmanager
+def gc_paused():
+    # parse trees have no reference cycles, so collections triggered by the
+    # allocation count alone are pure overhead while building one
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if gc_was_enabled:
+            gc.enable()
 
 csv.register_dialect('ckii', delimiter=';', doublequote=False,
                      quotechar='\0', quoting=csv.QUOTE_NONE, strict=True)
@@ -66,6 +90,55 @@ def files(glob, moddirs=(), basedir=vanilladir, reverse=False):
                        reverse=reverse):
         yield p
 
+@contextlib.contextmanager
+def open_save(path, encoding='cp1252', entry=None):
+    """open a save game as text, also if it is compressed
+
+    a compressed save is a zip archive, which is read from directly. entry
+    picks its member, by default gamestate (eu4) or else the largest one.
+    saves in the binary format can't be read and raise ValueError.
+    """
+    with contextlib.ExitStack() as stack:
+        if zipfile.is_zipfile(path):
+            archive = stack.enter_context(zipfile.ZipFile(path))
+            if entry is None:
+                if 'gamestate' in archive.namelist():
+                    entry = 'gamestate'
+                else:
+                    entry = max(archive.infolist(),
+                                key=lambda info: info.file_size).filename
+            raw = stack.enter_context(
+                io.BufferedReader(archive.open(entry)))
+        else:
+            raw = stack.enter_context(open(path, 'rb'))
+        if re.match(rb'\w{3}bin', raw.peek(6)[:6]):
+            raise ValueError('{} is a binary save'.format(path))
+        yield stack.enter_context(
+            io.TextIOWrapper(raw, encoding, errors='replace'))
+
+def subscription_trie(subscriptions):
+    """return nested dicts of the keys of paths like 'provinces/*/cores'
+
+    None marks the end of a path and '*' matches any key
+    """
+    trie = {}
+    for subscription in subscriptions:
+        node = trie
+        for key in subscription.strip('/').split('/'):
+            node = node.setdefault(key, {})
+        node[None] = True
+    return trie
+
+def merge_tries(tries):
+    if len(tries) == 1:
+        return tries[0]
+    merged = collections.defaultdict(list)
+    for trie in tries:
+        for key, node in trie.items():
+            merged[key].append(node)
+    return {key: True if key is None else merge_tries(nodes)
+            for key, nodes in merged.items()}
+
 def get_cultures(parser, groups=True):
     cultures = []
     culture_groups = []
@@ -116,13 +189,21 @@ def get_provinces(parser):
                 continue
             yield number, title, tree
 
+def csv_entries(path):
+    """yield (key, value, line number) of each row of a localisation csv"""
+    for row, linenum in csv_rows(path, linenum=True):
+        yield row[0], row[1], linenum
+
+def localisation_index(moddirs=(), basedir=vanilladir):
+    """return the LocalisationIndex of the csv localisation of basedir and
+    moddirs, where the first entry of a key wins"""
+    from .localisation import LocalisationIndex
+    return LocalisationIndex(
+        cachedir / 'localisation',
+        files('localisation/*.csv', moddirs, basedir=basedir), csv_entries)
+
 def get_localisation(moddirs=(), basedir=vanilladir):
-    locs = {}
-    for path in files('localisation/*.csv', moddirs, basedir=basedir):
-        for row in csv_rows(path):
-            if row[0] not in locs:
-                locs[row[0]] = row[1]
-    return locs
+    return localisation_index(moddirs, basedir).to_dict()
 
 def first_post_comment(item):
     if item.post_comment:
@@ -189,6 +270,8 @@ def comments_to_str(parser, comments, indent):
 
 
 class Comment:
+    __slots__ = 'val',
+
     def __init__(self, string):
         if string and string[0] == '#':
             string = string[1:]
@@ -197,12 +280,19 @@ class Comment:
     def __str__(self):
         return ('# ' if self.val and self.val[0] != '#' else '#') + self.val
 
+    def __getstate__(self):
+        return self.val
+
+    def __setstate__(self, state):
+        self.val = state
+
 
 class Stringifiable:
-    pass
+    __slots__ = ()
 
 
 class TopLevel(Stringifiable):
+    __slots__ = 'contents', 'post_comments', '_dictionary', 'version'
 
     def __init__(self, contents=None, post_comments=None):
         super().__init__()
@@ -215,6 +305,14 @@ class TopLevel(Stringifiable):
         else:
             self.post_comments = [Comment(s) for s in post_comments]
         self._dictionary = None
+        self.version = None
+
+    def __getstate__(self):
+        return self.contents, self.post_comments, self.version
+
+    def __setstate__(self, state):
+        self.contents, self.post_comments, self.version = state
+        self._dictionary = None
 
     def __len__(self):
         return len(self.contents)
@@ -297,11 +395,12 @@ class TopLevel(Stringifiable):
 
 
 class Commented(Stringifiable):
+    __slots__ = '_pre_comments', 'val', 'post_comment'
 
     def __init__(self, *args):
         super().__init__()
         if len(args) == 3:
-            self.pre_comments = [Comment(s) for s in args[0]]
+            self._pre_comments = [Comment(s) for s in args[0]] or NO_COMMENTS
             self.val = self.str_to_val(args[1])
             self.post_comment = Comment(args[2]) if args[2] else None
         elif len(args) == 2:
@@ -312,13 +411,29 @@ class Commented(Stringifiable):
                 self.val = args[0]
             self.post_comment = args[1].post_comment
         else:
-            self.pre_comments = []
+            self._pre_comments = NO_COMMENTS
             self.val = self.str_to_val(args[0])
             self.post_comment = None
 
+    def __getstate__(self):
+        return self._pre_comments, self.val, self.post_comment
+
+    def __setstate__(self, state):
+        self._pre_comments, self.val, self.post_comment = state
+
+    @property
+    def pre_comments(self):
+        if self._pre_comments is NO_COMMENTS:
+            self._pre_comments = []
+        return self._pre_comments
+
+    @pre_comments.setter
+    def pre_comments(self, value):
+        self._pre_comments = value
+
     @property
     def has_comments(self):
-        return self.pre_comments or self.post_comment
+        return self._pre_comments or self.post_comment
 
     def str_to_val(self, string):
         return string
@@ -333,7 +448,7 @@ class Commented(Stringifiable):
     def str(self, parser, indent=0):
         s = ''
         indent_str = '\t' if parser.tab_indents else ' ' * parser.indent_width
-        if self.pre_comments:
+        if self._pre_comments:
             s += indent * indent_str
             s += comments_to_str(parser, self.pre_comments, indent)
         s += indent * indent_str + self.val_str()
@@ -347,7 +462,7 @@ class Commented(Stringifiable):
         indent_str = '\t' if parser.tab_indents else ' ' * parser.indent_width
         sep = '\n' + indent * indent_str
         s = ''
-        if self.pre_comments:
+        if self._pre_comments:
             if col > indent * parser.indent_width:
                 s += sep
                 nl += 1
@@ -375,11 +490,23 @@ class Commented(Stringifiable):
 
 @total_ordering
 class String(Commented):
+    __slots__ = 'force_quote',
 
     def __init__(self, *args):
         super().__init__(*args)
         self.force_quote = False
 
+    def __getstate__(self):
+        return super().__getstate__() + (self.force_quote,)
+
+    def __setstate__(self, state):
+        super().__setstate__(state[:3])
+        self.force_quote = state[3]
+
+    def str_to_val(self, string):
+        # keys repeat endlessly across a tree; share one object per spelling
+        return sys.intern(string) if type(string) is str else string
+
     def val_str(self):
         s = self.val
         if self.force_quote or not re.fullmatch(r'\S+', s):
@@ -407,6 +534,7 @@ class String(Commented):
 
 @total_ordering
 class Number(Commented):
+    __slots__ = ()
 
     def str_to_val(self, string):
         try:
@@ -433,6 +561,7 @@ class Number(Commented):
             return self.val < other
 
 class Date(Commented):
+    __slots__ = ()
 
     def str_to_val(self, string):
         return tuple((int(x) if x else 0) for x in string.split('.'))
@@ -442,10 +571,11 @@ class Date(Commented):
 
 
 class Op(Commented):
-    pass
+    __slots__ = ()
 
 
 class Pair(Stringifiable):
+    __slots__ = 'key', 'op', 'value'
 
     def __init__(self, *args):
         super().__init__()
@@ -473,6 +603,12 @@ class Pair(Stringifiable):
             self.op = Op('=')
             self.value = Obj([])
 
+    def __getstate__(self):
+        return self.key, self.op, self.value
+
+    def __setstate__(self, state):
+        self.key, self.op, self.value = state
+
     def __iter__(self):
         yield self.key
         yield self.value
@@ -553,6 +689,7 @@ class Pair(Stringifiable):
 
 
 class Obj(Stringifiable):
+    __slots__ = 'kel', 'contents', 'ker', '_dictionary'
 
     def __init__(self, kel, contents=None, ker=None):
         super().__init__()
@@ -566,6 +703,13 @@ class Obj(Stringifiable):
             self.ker = ker if ker is not None else Op('}')
         self._dictionary = None
 
+    def __getstate__(self):
+        return self.kel, self.contents, self.ker
+
+    def __setstate__(self, state):
+        self.kel, self.contents, self.ker = state
+        self._dictionary = None
+
     def __len__(self):
         return len(self.contents)
 
@@ -634,7 +778,7 @@ class Obj(Stringifiable):
         return s
 
     def might_fit_on_line(self, parser, indent):
-        if self.kel.has_comments or self.ker.pre_comments:
+        if self.kel.has_comments or self.ker._pre_comments:
             return False
         if self.contents and isinstance(self.contents[0], Pair):
             return (len(self) == 1 and not self.contents[0].has_comments and
@@ -777,19 +921,408 @@ class FullTokenizer(SimpleTokenizer):
     t = staticmethod(make_tokenizer(specs))
 
 
+class DescentTokenizer:
+    """Same tokens as SimpleTokenizer, from one compiled master regex.
+
+    Whitespace and comments are consumed in front of each token, and keys are
+    classified as Date/Number/Name by the regex itself, so every token costs
+    exactly one match. Tokens are (kind, value) tuples; kind is the index of
+    the matching group.
+    """
+    KEL, KER, OP, STRING, DATE, NUMBER, NAME = range(1, 8)
+    _end = r'(?=[\s"#<=>{}]|\Z)'
+    regex = re.compile(
+        r'\s*(?:#[^\n]*(?:\n|\Z)\s*)*'
+        r'(?:(\{)|(\})|([<=>]=?)|"([^"]*)"|'
+        r'(-?\d*\.\d*\.\d*)' + _end + '|'
+        r'(-?\d+(?:\.\d+)?)' + _end + '|'
+        r'([^\s"#<=>{}]+)|)')
+
+    @classmethod
+    def tokenize(cls, string):
+        return cls.tokenize_chunks((string,))
+
+    @classmethod
+    def tokenize_chunks(cls, chunks):
+        """tokenize text arriving in pieces, e.g. successive f.read(n) calls
+
+        a match running into the end of the buffered text may be cut short,
+        so it is retried once the next chunk has been appended
+        """
+        match = cls.regex.match
+        buf = ''
+        pos = 0
+        line = 1
+        col = 0
+        for chunk in itertools.chain(chunks, (None,)):
+            final = chunk is None
+            if not final:
+                newlines = buf.count('\n', 0, pos)
+                if newlines:
+                    line += newlines
+                    col = pos - buf.rfind('\n', 0, pos) - 1
+                else:
+                    col += pos
+                buf = buf[pos:] + chunk
+                pos = 0
+            end = len(buf)
+            while True:
+                m = match(buf, pos)
+                kind = m.lastindex
+                if not final and (kind is None or m.end() == end):
+                    break
+                pos = m.end()
+                if kind is None:
+                    if pos < end:
+                        newlines = buf.count('\n', 0, pos)
+                        if newlines:
+                            place = (line + newlines,
+                                     pos - buf.rfind('\n', 0, pos))
+                        else:
+                            place = line, col + pos + 1
+                        raise LexerError(place, buf[pos:pos + 20])
+                    return
+                yield kind, m.group(kind)
+
+
+class SaveScanner:
+    """DescentTokenizer tokens of text arriving in pieces, which can also skip
+    the rest of an object without tokenizing it
+
+    skipping only looks for braces outside of strings and comments, so it is
+    much faster than going through the tokens. used by parse_save.
+    """
+    skip_regex = re.compile(r'(?:[^{}"#]+|"[^"]*"|#[^\n]*\n)*')
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.buf = ''
+        self.pos = 0
+        self.line = 1
+        self.final = False
+
+    def refill(self):
+        """drop the consumed text and append the next chunk, if there is one"""
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            self.final = True
+            return False
+        self.line += self.buf.count('\n', 0, self.pos)
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        match = DescentTokenizer.regex.match
+        while True:
+            m = match(self.buf, self.pos)
+            kind = m.lastindex
+            if self.final or (kind is not None and m.end() < len(self.buf)):
+                break
+            self.refill()
+        self.pos = m.end()
+        if kind is None:
+            if self.pos < len(self.buf):
+                line = self.line + self.buf.count('\n', 0, self.pos)
+                col = self.pos - self.buf.rfind('\n', 0, self.pos)
+                raise LexerError((line, col),
+                                 self.buf[self.pos:self.pos + 20])
+            raise StopIteration
+        return kind, m.group(kind)
+
+    def skip_object(self):
+        """skip to the end of the object whose { was the last token"""
+        depth = 1
+        while True:
+            self.pos = self.skip_regex.match(self.buf, self.pos).end()
+            char = self.buf[self.pos:self.pos + 1]
+            if char == '{':
+                depth += 1
+            elif char == '}':
+                depth -= 1
+            elif not self.refill():
+                # the end, or a string or comment which isn't closed
+                raise NoParseError('got unexpected end of file', None)
+            else:
+                continue
+            self.pos += 1
+            if depth == 0:
+                return
+
+
+# binary cache format: a header, then a flat table of int64 codes giving the
+# tree in preorder, then the string pool (character offsets into one utf-8
+# text) and a pool of floats. each value node is a tag, which is a kind
+# ORed with comment and quoting flags, followed by its payload.
+TREE_MAGIC = b'CK2T'
+TREE_HEADER = struct.Struct('=4sIQQQ')
+_PAIR, _OBJ, _STRING, _NUMBER, _FLOAT, _DATE, _OP = range(7)
+_PRE, _POST, _QUOTE = 8, 16, 32
+
+def dump_tree(tree):
+    """return tree as bytes in the binary cache format
+
+    raises TypeError or OverflowError for trees the format can't hold
+    """
+    codes = array.array('q')
+    emit = codes.append
+    strings = {}
+    floats = array.array('d')
+
+    def emit_node(node):
+        cls = type(node)
+        if cls is Pair:
+            emit(_PAIR)
+            emit_node(node.key)
+            emit_node(node.op)
+            emit_node(node.value)
+            return
+        if cls is Obj:
+            emit(_OBJ)
+            emit_node(node.kel)
+            emit(len(node.contents))
+            for item in node.contents:
+                emit_node(item)
+            emit_node(node.ker)
+            return
+        if cls is String:
+            tag = _STRING | _QUOTE if node.force_quote else _STRING
+        elif cls is Op:
+            tag = _OP
+        elif cls is Number:
+            tag = _NUMBER if type(node.val) is int else _FLOAT
+        elif cls is Date:
+            tag = _DATE
+        else:
+            raise TypeError('cannot store {!r}'.format(node))
+        pre_comments = node._pre_comments
+        if pre_comments:
+            tag |= _PRE
+        if node.post_comment is not None:
+            tag |= _POST
+        emit(tag)
+        if pre_comments:
+            emit(len(pre_comments))
+            for comment in pre_comments:
+                emit(strings.setdefault(comment.val, len(strings)))
+        if node.post_comment is not None:
+            emit(strings.setdefault(node.post_comment.val, len(strings)))
+        if tag & 7 == _NUMBER:
+            emit(node.val)
+        elif tag & 7 == _FLOAT:
+            emit(len(floats))
+            floats.append(node.val)
+        elif tag & 7 == _DATE:
+            emit(len(node.val))
+            codes.extend(node.val)
+        else:
+            emit(strings.setdefault(node.val, len(strings)))
+
+    emit(len(tree.post_comments))
+    for comment in tree.post_comments:
+        emit(strings.setdefault(comment.val, len(strings)))
+    emit(len(tree.contents))
+    for item in tree.contents:
+        emit_node(item)
+    offsets = array.array('q', [0])
+    offsets.extend(itertools.accumulate(len(s) for s in strings))
+    text = ''.join(strings).encode('utf-8', 'surrogatepass')
+    header = TREE_HEADER.pack(TREE_MAGIC, VERSION, len(codes), len(strings),
+                              len(floats))
+    return b''.join([header, codes.tobytes(), offsets.tobytes(),
+                     floats.tobytes(), text])
+
+def load_tree(buffer):
+    """return the tree stored in buffer by dump_tree
+
+    buffer may be any bytes-like object, e.g. a slice of an mmap. raises
+    ValueError if it holds no tree, or one from another VERSION.
+    """
+    view = memoryview(buffer)
+    magic, version, num_codes, num_strings, num_floats = (
+        TREE_HEADER.unpack_from(view))
+    if magic != TREE_MAGIC or version != VERSION:
+        raise ValueError('no current parse tree in buffer')
+    pos = TREE_HEADER.size
+    codes = view[pos:pos + 8 * num_codes].cast('q').tolist()
+    pos += 8 * num_codes
+    offsets = view[pos:pos + 8 * (num_strings + 1)].cast('q').tolist()
+    pos += 8 * (num_strings + 1)
+    floats = view[pos:pos + 8 * num_floats].cast('d').tolist()
+    pos += 8 * num_floats
+    text = str(view[pos:], 'utf-8', 'surrogatepass')
+    strings = [sys.intern(text[i:j]) for i, j in zip(offsets, offsets[1:])]
+    take = iter(codes).__next__
+    new = object.__new__
+    commented = {_STRING: String, _NUMBER: Number, _FLOAT: Number,
+                 _DATE: Date, _OP: Op}
+
+    def comment(index):
+        comment = new(Comment)
+        comment.val = strings[index]
+        return comment
+
+    def load_node():
+        tag = take()
+        # pairs and uncommented leaves are the bulk of any tree, so they skip
+        # the general case below
+        if tag == _PAIR:
+            node = new(Pair)
+            node.key = load_node()
+            node.op = load_node()
+            node.value = load_node()
+            return node
+        if tag == _STRING:
+            node = new(String)
+            node._pre_comments = NO_COMMENTS
+            node.val = strings[take()]
+            node.post_comment = None
+            node.force_quote = False
+            return node
+        if tag == _OP:
+            node = new(Op)
+            node._pre_comments = NO_COMMENTS
+            node.val = strings[take()]
+            node.post_comment = None
+            return node
+        if tag == _NUMBER:
+            node = new(Number)
+            node._pre_comments = NO_COMMENTS
+            node.val = take()
+            node.post_comment = None
+            return node
+        kind = tag & 7
+        if kind == _OBJ:
+            node = new(Obj)
+            node.kel = load_node()
+            node.contents = [load_node() for _ in range(take())]
+            node.ker = load_node()
+            node._dictionary = None
+            return node
+        node = new(commented[kind])
+        if tag & _PRE:
+            node._pre_comments = [comment(take()) for _ in range(take())]
+        else:
+            node._pre_comments = NO_COMMENTS
+        node.post_comment = comment(take()) if tag & _POST else None
+        if kind == _NUMBER:
+            node.val = take()
+        elif kind == _FLOAT:
+            node.val = floats[take()]
+        elif kind == _DATE:
+            node.val = tuple(take() for _ in range(take()))
+        else:
+            node.val = strings[take()]
+            if kind == _STRING:
+                node.force_quote = bool(tag & _QUOTE)
+        return node
+
+    tree = new(TopLevel)
+    tree.post_comments = [comment(take()) for _ in range(take())]
+    tree.contents = [load_node() for _ in range(take())]
+    tree._dictionary = None
+    tree.version = version
+    return tree
+
+# one archive per commit holds the binary trees cached for that commit: a
+# header, an index of (cache file name, offset, length), then the trees
+ARCHIVE_MAGIC = b'CK2A'
+ARCHIVE_HEADER = struct.Struct('=4sIQ')
+ARCHIVE_ENTRY = struct.Struct('=32sQQ')
+
+def open_archive(path):
+    """return (mmap, index) for the archive at path, or None"""
+    try:
+        with path.open('rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        magic, version, num_entries = ARCHIVE_HEADER.unpack_from(buffer)
+        if magic != ARCHIVE_MAGIC or version != VERSION:
+            raise ValueError
+        start = ARCHIVE_HEADER.size
+        end = start + ARCHIVE_ENTRY.size * num_entries
+        # a truncated archive is ignored like a stale one
+        if end > len(buffer):
+            raise ValueError
+        index = {name.decode(): (offset, offset + length)
+                 for name, offset, length
+                 in ARCHIVE_ENTRY.iter_unpack(buffer[start:end])}
+    except (struct.error, ValueError):
+        buffer.close()
+        return None
+    return buffer, index
+
+def write_archive(path, entries):
+    """write dict entries of cache file name to bytes as an archive"""
+    offset = ARCHIVE_HEADER.size + ARCHIVE_ENTRY.size * len(entries)
+    index = []
+    blobs = []
+    for name, blob in entries.items():
+        index.append(ARCHIVE_ENTRY.pack(name.encode(), offset, len(blob)))
+        # keep each tree's int64 tables aligned
+        padding = bytes(-len(blob) % 8)
+        blobs.extend((blob, padding))
+        offset += len(blob) + len(padding)
+    temp_path = path.with_name(path.name + '.tmp')
+    with temp_path.open('wb') as f:
+        f.write(ARCHIVE_HEADER.pack(ARCHIVE_MAGIC, VERSION, len(entries)))
+        f.writelines(index)
+        f.writelines(blobs)
+    os.replace(temp_path, path)
+
+
+def git_log_files(log_output):
+    """yield (commit, path) for each file named by a -z --name-only log"""
+    log_iter = iter(log_output.split('\x00'))
+    for entry in log_iter:
+        try:
+            commit, file_str = entry.split('\n', maxsplit=1)
+        except ValueError:
+            continue
+        while file_str:
+            yield commit, file_str
+            file_str = next(log_iter, '')
+
+
+_worker_parser = None
+
+def _init_parse_worker(parser_class, strict, engine):
+    global _worker_parser
+    _worker_parser = parser_class(strict=strict, engine=engine)
+    # caching is decided by the parent; this also silences the hit report
+    _worker_parser.ignore_cache = True
+
+def _parse_in_worker(path, encoding, errors, chunk_size, cachepath):
+    return _worker_parser.parse_uncached(path, encoding, errors, chunk_size,
+                                         cachepath)
+
+
 class SimpleParser:
     tokenizer = SimpleTokenizer
+    engines = 'funcparserlib', 'descent'
     repos = {}
+    archives = {}
 
-    def __init__(self, *moddirs, strict=True):
+    def __init__(self, *moddirs, strict=True, engine='funcparserlib'):
+        if engine not in self.engines:
+            raise ValueError('{} does not support engine {!r}'.format(
+                             self.__class__.__name__, engine))
         self.moddirs = list(moddirs)
         self.basedir = vanilladir
         self.strict = strict
+        self.engine = engine
         self.cache_hits = 0
         self.cache_misses = 0
         self.parse_tree_cache = {}
         self.memcache_default = False
         self.diskcache_default = True
+        self.chunk_size_default = None
+        self.workers_default = None
         self.tab_indents = True
         self.indent_width = 8 # minimum 2
         self.chars_per_line = 125
@@ -801,6 +1334,8 @@ class SimpleParser:
         self.encoding = 'cp1252'
         self.ignore_cache = False
         self.vanilla_is_repo = True
+        # key the disk cache on file contents rather than path and commit
+        self.cache_by_content = False
         self.cachedir = cachedir / self.__class__.__name__
         self.cachedir.mkdir(parents=True, exist_ok=True)
         self.setup_parser()
@@ -851,6 +1386,8 @@ class SimpleParser:
                 del self.repos[bad_repo_path]
 
     def get_cachepath(self, path, encoding):
+        if self.cache_by_content:
+            return self.content_cachepath(path, encoding), True
         m = hashlib.md5()
         m.update(encoding.encode())
         m.update(bytes(path))
@@ -878,25 +1415,7 @@ class SimpleParser:
                     return self.cachedir / 'vanilla' / name, False
                 return self.cachedir / name, False
             repo_path = pathlib.Path(repo.working_tree_dir)
-            tracked_files = set(repo.git.ls_files(z=True).split('\x00')[:-1])
-            latest_commit = {}
-            log_output = repo.git.log('.', m=True, pretty='format:%h', z=True,
-                                      name_only=True)
-            log_iter = iter(log_output.split('\x00'))
-            for entry in log_iter:
-                try:
-                    commit, file_str = entry.split('\n', maxsplit=1)
-                except ValueError:
-                    continue
-                while file_str:
-                    try:
-                        tracked_files.remove(file_str)
-                        latest_commit[file_str] = commit
-                    except KeyError:
-                        pass
-                    file_str = next(log_iter)
-                if not tracked_files:
-                    break
+            latest_commit = self.latest_commits(repo, repo_path)
             dirty_paths = []
             status_output = repo.git.status(z=True)
             status_iter = iter(status_output.split('\x00')[:-1])
@@ -914,6 +1433,76 @@ class SimpleParser:
             return repo_cachedir / latest_commit[str(path)] / name, True
         return repo_cachedir / name, False
 
+    def content_cachepath(self, path, encoding):
+        """return the cache path for the bytes of path as this parser reads
+        them
+
+        identical files share one entry whatever their path, mod, branch or
+        worktree, and the entry never goes stale. entries are spread over
+        subdirectories which pack_cache packs like commits.
+        """
+        m = hashlib.blake2b(digest_size=16)
+        with path.open('rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                m.update(chunk)
+        m.update('\0{}\0{}\0{}\0{}'.format(
+                 encoding, self.engine, self.strict, VERSION).encode())
+        name = m.hexdigest()
+        return self.cachedir / 'content' / name[:2] / name
+
+    def latest_commits(self, repo, repo_path):
+        """return a dict of each tracked file to the commit last changing it
+
+        the dict is kept on disk along with the HEAD it describes. if HEAD
+        has since moved on, only the log of the new commits is read.
+        """
+        index_path = cachedir / 'git_index' / repo_path.name
+        head = repo.head.commit.hexsha
+        try:
+            with index_path.open('rb') as f:
+                indexed_path, indexed_head, latest_commit = pickle.load(f)
+            if indexed_path != repo_path:
+                raise ValueError(indexed_path)
+        except (OSError, pickle.PickleError, EOFError, TypeError,
+                ValueError):
+            indexed_head = None
+        if indexed_head == head:
+            return latest_commit
+        try:
+            # false too once the old HEAD is rebased away or checked out past
+            incremental = (indexed_head is not None and
+                           repo.is_ancestor(indexed_head, head))
+        except git.GitCommandError:
+            incremental = False
+        if incremental:
+            log_output = repo.git.log('{}..{}'.format(indexed_head, head),
+                                      m=True, pretty='format:%h', z=True,
+                                      name_only=True)
+            updated = set()
+            for commit, file_str in git_log_files(log_output):
+                if file_str not in updated:
+                    updated.add(file_str)
+                    latest_commit[file_str] = commit
+        else:
+            tracked_files = set(repo.git.ls_files(z=True).split('\x00')[:-1])
+            latest_commit = {}
+            log_output = repo.git.log('.', m=True, pretty='format:%h', z=True,
+                                      name_only=True)
+            for commit, file_str in git_log_files(log_output):
+                try:
+                    tracked_files.remove(file_str)
+                    latest_commit[file_str] = commit
+                except KeyError:
+                    pass
+                if not tracked_files:
+                    break
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = index_path.with_name(index_path.name + '.tmp')
+        with temp_path.open('wb') as f:
+            pickle.dump((repo_path, head, latest_commit), f)
+        os.replace(temp_path, index_path)
+        return latest_commit
+
     def files(self, glob, reverse=False):
         yield from files(glob, self.moddirs, basedir=self.basedir,
                          reverse=reverse)
@@ -929,74 +1518,390 @@ class SimpleParser:
 
         return dictionary.items()
 
-    def parse_files(self, glob, basedir=None, moddirs=None, **kwargs):
+    def parse_files(self, glob, basedir=None, moddirs=None, workers=None,
+                    **kwargs):
+        """yield (path, tree) for each file matched by glob, in files() order
+
+        with workers > 1, files missing from the memory and disk caches are
+        parsed by that many worker processes while cache hits are loaded
+        here. each distinct file is parsed at most once and written to the
+        disk cache by the worker that parsed it. the parser class must be
+        importable by the workers, and scripts need an
+        if __name__ == '__main__' guard where processes are spawned.
+        """
         if moddirs is None:
             moddirs = self.moddirs
         if basedir is None:
             basedir = self.basedir
-        for path in files(glob, moddirs, basedir=basedir):
-            if path.is_file():
-                yield path.resolve(), self.parse_file(path, **kwargs)
+        if workers is None:
+            workers = self.workers_default
+        paths = (p for p in files(glob, moddirs, basedir=basedir)
+                 if p.is_file())
+        if workers and workers > 1:
+            yield from self.parse_files_parallel(paths, workers, **kwargs)
+            return
+        for path in paths:
+            yield path.resolve(), self.parse_file(path, **kwargs)
+
+    def parse_files_parallel(self, paths, workers, encoding=None,
+                             errors='replace', memcache=None, diskcache=None,
+                             chunk_size=None):
+        if memcache is None:
+            memcache = self.memcache_default
+        if diskcache is None:
+            diskcache = self.diskcache_default
+        if chunk_size is None:
+            chunk_size = self.chunk_size_default
+        if encoding is None:
+            encoding = self.encoding
+        ignore_cache = (self.ignore_cache or errors != 'replace')
+        paths = [p.resolve() for p in paths]
+        jobs = {}
+        # the cache path of each hit, so its file isn't hashed again
+        hits = {}
+        pool = concurrent.futures.ProcessPoolExecutor(
+            workers, initializer=_init_parse_worker,
+            initargs=(self.__class__, self.strict, self.engine))
+        try:
+            for path in paths:
+                if path in jobs or path in hits:
+                    continue
+                if ignore_cache:
+                    cachepath = None
+                elif path in self.parse_tree_cache:
+                    continue
+                else:
+                    cachepath, usable = self.cache_lookup(path, encoding)
+                    if usable:
+                        hits[path] = cachepath
+                        continue
+                    if not diskcache:
+                        cachepath = None
+                jobs[path] = pool.submit(_parse_in_worker, path, encoding,
+                                         errors, chunk_size, cachepath)
+            for path in paths:
+                job = jobs.pop(path, None)
+                if job is not None:
+                    tree = job.result()
+                    if not ignore_cache:
+                        self.cache_misses += 1
+                        if memcache:
+                            self.parse_tree_cache[path] = tree
+                elif path in hits and path not in self.parse_tree_cache:
+                    tree = self.parse_with_cache(
+                        path, hits[path], True, encoding, errors, memcache,
+                        diskcache, chunk_size)
+                else:
+                    # repeats of a path parsed above
+                    tree = self.parse_file(path, encoding, errors, memcache,
+                                           diskcache, chunk_size)
+                yield path, tree
+        finally:
+            pool.shutdown(cancel_futures=True)
 
     def parse_file(self, path, encoding=None, errors='replace',
-                   memcache=None, diskcache=None):
+                   memcache=None, diskcache=None, chunk_size=None):
         try:
             path = path.resolve()
         except AttributeError:
-            return self.parse_file(self.file(path),
-                                   encoding, errors, memcache, diskcache)
+            return self.parse_file(self.file(path), encoding, errors,
+                                   memcache, diskcache, chunk_size)
         if memcache is None:
             memcache = self.memcache_default
         if diskcache is None:
             diskcache = self.diskcache_default
+        if chunk_size is None:
+            chunk_size = self.chunk_size_default
         if encoding is None:
             encoding = self.encoding
         ignore_cache = (self.ignore_cache or errors != 'replace')
-        if not ignore_cache:
-            if path in self.parse_tree_cache:
-                return self.parse_tree_cache[path]
-            cachepath, is_indexed = self.get_cachepath(path, encoding)
-            try:
-                if cachepath.exists() and (is_indexed or
-                                           (os.path.getmtime(str(cachepath)) >=
-                                            os.path.getmtime(str(path)))):
-                    with cachepath.open('rb') as f:
-                        tree = pickle.load(f)
-                        if tree.version == VERSION:
-                            if memcache:
-                                self.parse_tree_cache[path] = tree
-                            self.cache_hits += 1
-                            return tree
-            except AttributeError:
-                pass
-            except (pickle.PickleError, EOFError, ImportError, IndexError):
-                print('Error retrieving cache for {}'.format(path),
-                      file=sys.stderr)
-                traceback.print_exc()
-                pass
+        if ignore_cache:
+            return self.parse_uncached(path, encoding, errors, chunk_size)
+        if path in self.parse_tree_cache:
+            return self.parse_tree_cache[path]
+        cachepath, usable = self.cache_lookup(path, encoding)
+        return self.parse_with_cache(path, cachepath, usable, encoding, errors,
+                                     memcache, diskcache, chunk_size)
+
+    def parse_with_cache(self, path, cachepath, usable, encoding, errors,
+                         memcache, diskcache, chunk_size):
+        """return the tree of path, loaded from cachepath if usable"""
+        tree = self.load_cache(path, cachepath) if usable else None
+        if tree is not None:
+            self.cache_hits += 1
+        else:
             self.cache_misses += 1
+            tree = self.parse_uncached(path, encoding, errors, chunk_size,
+                                       cachepath if diskcache else None)
+        if memcache:
+            self.parse_tree_cache[path] = tree
+        return tree
+
+    def cache_lookup(self, path, encoding):
+        """return the cache path for path and whether it can be loaded"""
+        cachepath, is_indexed = self.get_cachepath(path, encoding)
+        if is_indexed:
+            usable = (cachepath.exists() or
+                      self.archived(cachepath) is not None)
+        else:
+            usable = cachepath.exists() and (os.path.getmtime(str(cachepath))
+                                             >= os.path.getmtime(str(path)))
+        return cachepath, usable
+
+    def archived(self, cachepath):
+        """return a view of cachepath's entry in its commit's archive"""
+        commit_dir = cachepath.parent
+        archive_path = commit_dir.with_name(commit_dir.name + '.pack')
+        try:
+            archive = self.archives[archive_path]
+        except KeyError:
+            archive = self.archives[archive_path] = open_archive(archive_path)
+        if archive is not None:
+            buffer, index = archive
+            if cachepath.name in index:
+                start, end = index[cachepath.name]
+                return memoryview(buffer)[start:end]
+        return None
+
+    def pack_cache(self):
+        """pack the cache files of each commit into one archive per commit
+
+        only trees indexed by commit are packed, since those never go
+        stale. archives are memory-mapped rather than opening and reading
+        a file per tree. run it after a full warm-up, e.g. at the end of a
+        script; trees cached later are merged in by the next call.
+        """
+        for repo_cachedir in self.cachedir.iterdir():
+            if not repo_cachedir.is_dir():
+                continue
+            for commit_dir in list(repo_cachedir.iterdir()):
+                if not commit_dir.is_dir():
+                    continue
+                loose_paths = [p for p in commit_dir.iterdir() if p.is_file()]
+                if not loose_paths:
+                    continue
+                archive_path = commit_dir.with_name(commit_dir.name + '.pack')
+                archive = self.archives.pop(archive_path, None)
+                if archive is None:
+                    archive = open_archive(archive_path)
+                entries = {}
+                if archive is not None:
+                    buffer, index = archive
+                    for name, (start, end) in index.items():
+                        entries[name] = buffer[start:end]
+                    buffer.close()
+                for loose_path in loose_paths:
+                    entries[loose_path.name] = loose_path.read_bytes()
+                write_archive(archive_path, entries)
+                for loose_path in loose_paths:
+                    loose_path.unlink()
+                try:
+                    commit_dir.rmdir()
+                except OSError:
+                    pass
+
+    def load_cache(self, path, cachepath):
+        try:
+            with gc_paused():
+                if cachepath.exists():
+                    data = cachepath.read_bytes()
+                else:
+                    data = self.archived(cachepath)
+                if data[:len(TREE_MAGIC)] == TREE_MAGIC:
+                    return load_tree(data)
+                # trees the binary format can't hold are pickled instead
+                tree = pickle.loads(data)
+            if tree.version == VERSION:
+                return tree
+        except (AttributeError, TypeError, ValueError):
+            # pickled by an older, differently shaped version of a class
+            pass
+        except (pickle.PickleError, struct.error, EOFError, ImportError,
+                IndexError, StopIteration):
+            print('Error retrieving cache for {}'.format(path),
+                  file=sys.stderr)
+            traceback.print_exc()
+        return None
+
+    def parse_uncached(self, path, encoding, errors='replace',
+                       chunk_size=None, cachepath=None):
+        """parse path, caching the tree at cachepath if one is given"""
         with path.open(encoding=encoding, errors=errors) as f:
             try:
-                tree = self.parse(f.read())
-                if not ignore_cache:
-                    if diskcache:
-                        cachepath.parent.mkdir(parents=True, exist_ok=True)
-                        # possible todo: put this i/o in another thread
-                        with cachepath.open('wb') as f:
-                            tree.version = VERSION
-                            pickle.dump(tree, f)
-                    if memcache:
-                        self.parse_tree_cache[path] = tree
+                if chunk_size:
+                    tree = self.parse_chunks(
+                        iter(lambda: f.read(chunk_size), ''))
+                else:
+                    tree = self.parse(f.read())
+                if cachepath is not None:
+                    tree.version = VERSION
+                    try:
+                        data = dump_tree(tree)
+                    except (TypeError, OverflowError):
+                        # e.g. nodes of a subclass, or an enormous integer
+                        data = pickle.dumps(tree)
+                    cachepath.parent.mkdir(parents=True, exist_ok=True)
+                    # possible todo: put this i/o in another thread
+                    with cachepath.open('wb') as f:
+                        f.write(data)
                 return tree
             except:
                 print(path, file=sys.stderr)
                 raise
 
     def parse(self, string):
+        if self.engine == 'descent':
+            return self.descent_parse(DescentTokenizer.tokenize(string))
         tokens = list(self.tokenizer.tokenize(string))
         tree = self.toplevel.parse(tokens)
         return tree
 
+    def parse_chunks(self, chunks):
+        """parse text given as an iterable of strings
+
+        with the descent engine, tokens are pulled from the chunks lazily and
+        neither the whole text nor a token list is ever held in memory.
+        the funcparserlib engine needs random access, so it joins the chunks.
+        """
+        if self.engine == 'descent':
+            return self.descent_parse(DescentTokenizer.tokenize_chunks(chunks))
+        return self.parse(''.join(chunks))
+
+    def descent_parse(self, tokens):
+        with gc_paused():
+            return self._descent_parse(tokens)
+
+    def _descent_parse(self, tokens):
+        """single pass, no backtracking; builds the same tree as toplevel"""
+        t = DescentTokenizer
+        node_types = {t.STRING: String, t.DATE: Date, t.NUMBER: Number,
+                      t.NAME: String}
+        stack = []
+        contents = []
+        tok = next(tokens, None)
+        while tok is not None:
+            kind, val = tok
+            if kind in node_types:
+                key = node_types[kind](val)
+                tok = next(tokens, None)
+                if tok is not None and tok[0] == t.OP:
+                    op = Op(tok[1])
+                    tok = next(tokens, None)
+                    if tok is None:
+                        raise NoParseError('got unexpected end of file', None)
+                    if tok[0] == t.KEL:
+                        stack.append((contents, key, op))
+                        contents = []
+                    elif tok[0] in node_types:
+                        value = node_types[tok[0]](tok[1])
+                        contents.append(Pair(key, op, value))
+                    else:
+                        raise NoParseError('got unexpected token: {!r}'.format(
+                                           tok[1]), None)
+                elif stack:
+                    contents.append(key)
+                    continue
+                else:
+                    raise NoParseError('expected op after {!r}'.format(val),
+                                       None)
+            elif kind == t.KEL and stack:
+                stack.append((contents, None, None))
+                contents = []
+            elif kind == t.KER and stack:
+                obj = Obj(Op('{'), contents, Op('}'))
+                contents, key, op = stack.pop()
+                contents.append(obj if key is None else Pair(key, op, obj))
+            else:
+                raise NoParseError('got unexpected token: {!r}'.format(val),
+                                   None)
+            tok = next(tokens, None)
+        if stack and self.strict:
+            raise NoParseError('got unexpected end of file', None)
+        while stack:
+            obj = Obj(Op('{'), contents)
+            contents, key, op = stack.pop()
+            contents.append(obj if key is None else Pair(key, op, obj))
+        return TopLevel(contents)
+
+    def parse_save(self, path, subscriptions, encoding=None, entry=None,
+                   chunk_size=1 << 20):
+        """yield (keys, value) for the parts of a save matching subscriptions
+
+        subscriptions are paths of keys separated by slashes, where * matches
+        any key, e.g. 'provinces/*/cores'. keys is the tuple of the actual
+        keys and value the parsed subtree, as in a tree from parse_file. only
+        matched subtrees are built; the rest is skipped as it is read, so
+        memory use doesn't grow with the save. compressed saves are read
+        straight from the archive; see open_save.
+        """
+        t = DescentTokenizer
+        scalar = {t.STRING, t.DATE, t.NUMBER, t.NAME}
+        if encoding is None:
+            encoding = self.encoding
+        with open_save(path, encoding, entry) as f:
+            tokens = SaveScanner(iter(lambda: f.read(chunk_size), ''))
+
+            def value_tokens(first):
+                yield first
+                if first[0] == t.KEL:
+                    depth = 1
+                    for tok in tokens:
+                        yield tok
+                        if tok[0] == t.KEL:
+                            depth += 1
+                        elif tok[0] == t.KER:
+                            depth -= 1
+                            if depth == 0:
+                                return
+
+            # the subscriptions below each open object, innermost last
+            stack = [subscription_trie(subscriptions)]
+            keys = []
+            tok = next(tokens, None)
+            while tok is not None:
+                kind, val = tok
+                # braces are handled before reading ahead, so that
+                # skip_object starts right after the opening one
+                if kind == t.KER:
+                    # the closing brace of the whole ck2 save is unmatched
+                    if keys:
+                        stack.pop()
+                        keys.pop()
+                    tok = next(tokens, None)
+                    continue
+                if kind == t.KEL:
+                    # a value of a list can't be subscribed to
+                    tokens.skip_object()
+                    tok = next(tokens, None)
+                    continue
+                if kind not in scalar:
+                    raise NoParseError('got unexpected token: {!r}'.format(
+                                       val), None)
+                tok = next(tokens, None)
+                if tok is None or tok[0] not in (t.OP, t.KEL):
+                    # a value of a list, or the header, e.g. EU4txt
+                    continue
+                if tok[0] == t.OP:
+                    tok = next(tokens, None)
+                    if tok is None:
+                        raise NoParseError('got unexpected end of file', None)
+                    if tok[0] not in scalar and tok[0] != t.KEL:
+                        raise NoParseError('got unexpected token: {!r}'.format(
+                                           tok[1]), None)
+                matches = [node for node in (stack[-1].get(val),
+                                             stack[-1].get('*'))
+                           if node is not None]
+                if any(None in node for node in matches):
+                    tree = self.descent_parse(itertools.chain(
+                        [(t.NAME, val), (t.OP, '=')], value_tokens(tok)))
+                    yield (*keys, val), tree.contents[0].value
+                elif matches and tok[0] == t.KEL:
+                    stack.append(merge_tries(matches))
+                    keys.append(val)
+                elif tok[0] == t.KEL:
+                    tokens.skip_object()
+                tok = next(tokens, None)
+
     def write(self, tree, path):
         path.parent.mkdir(parents=True, exist_ok=True)
         try:
@@ -1009,6 +1914,7 @@ class SimpleParser:
 
 class FullParser(SimpleParser):
     tokenizer = FullTokenizer
+    engines = 'funcparserlib',
 
     def setup_parser(self):
         unarg = lambda f: lambda x: f(*x)
@@ -4,6 +4,7 @@ from collections import defaultdict
 import pprint
 from . import ck3parser
 from .print_time import print_time
+from . import timeline
 
 parser = ck3parser.SimpleParser()
 
@@ -12,11 +13,14 @@ parser = ck3parser.SimpleParser()
 def main():
     traits = highest_education_traits()
     starts_by_trait = {t: [] for t in traits}
-    for date in start_dates():
-        titles_by_char = held_titles(date)
-        top_titles_by_char = {c: top_tier_titles(l)
-                              for c, l in titles_by_char.items()}
-        for trait, chars in chars_with_traits(date, traits).items():
+    dates = start_dates()
+    # each history file is replayed once for all the start dates
+    titles_by_char_by_date = held_titles(dates)
+    chars_by_trait_by_date = chars_with_traits(dates, traits)
+    for date in dates:
+        top_titles_by_char = {c: top_tier_titles(l) for c, l
+                              in titles_by_char_by_date[date].items()}
+        for trait, chars in chars_by_trait_by_date[date].items():
             for char in chars:
                 titles = top_titles_by_char.get(char)
                 if titles:
@@ -38,30 +42,42 @@ def start_dates():
     return sorted(result)
 
 
-def chars_with_traits(date, traits):
-    result = defaultdict(list)
-    for _, tree in parser.parse_files('history/characters/*.txt',
-                                      memcache=True):
+def dated_ticks(history):
+    return [(n.val, v) for n, v in history if isinstance(n, ck3parser.Date)]
+
+
+def chars_with_traits(dates, traits):
+    """return a dict of each of the ascending dates to a dict of each of
+    traits to the characters who have it at that date"""
+    traits = set(traits)
+    result = {date: defaultdict(list) for date in dates}
+    for _, tree in parser.parse_files('history/characters/*.txt'):
         for n, v in tree:
-            for trait in traits_when(v, date).intersection(traits):
-                result[trait].append(str(n.val))
+            for date, char_traits in zip(dates, traits_when(v, dates, traits)):
+                for trait in char_traits:
+                    result[date][trait].append(str(n.val))
     return result
 
 
 # XXX assumes we only care about traits with minimum_age = 16
-def traits_when(char_history, date):
+def traits_when(char_history, dates, of_interest=None):
+    """return the traits of the character at each of the ascending dates,
+    restricted to the set of_interest if it is given"""
     life = {'birth': None, 'death': None}
     traits = set()
     tick_history(traits, life, char_history)
-    ticks = sorted(((n.val, v) for n, v in char_history
-                    if isinstance(n, ck3parser.Date) and n.val <= date),
-                   key=lambda x: x[0])
-    for tick_date, tick in ticks:
-        tick_history(traits, life, tick, tick_date)
-    if (life['birth'] is None or life['birth'] > (date[0] - 16, *date[1:]) or
-            life['death'] is not None and life['death'] <= date):
-        traits.clear()
-    return traits
+
+    def snapshot(state, date):
+        traits, life = state
+        if (life['birth'] is None or
+                life['birth'] > (date[0] - 16, *date[1:]) or
+                life['death'] is not None and life['death'] <= date):
+            return set()
+        return traits & of_interest if of_interest is not None else set(traits)
+
+    return timeline.replay(
+        dated_ticks(char_history), dates, (traits, life),
+        lambda state, tick, date: tick_history(*state, tick, date), snapshot)
 
 
 def tick_history(traits, life, tick, date=(0, 0, 0)):
@@ -83,13 +99,15 @@ def date_str_to_tuple(string):
     return tuple((int(x) if x else 0) for x in string.split('.'))
 
 
-def held_titles(date):
-    result = defaultdict(list)
-    for _, tree in parser.parse_files('history/titles/*.txt', memcache=True):
+def held_titles(dates):
+    """return a dict of each of the ascending dates to a dict of each
+    character to the titles they hold at that date"""
+    result = {date: defaultdict(list) for date in dates}
+    for _, tree in parser.parse_files('history/titles/*.txt'):
         for n, v in tree:
-            holder = title_holder_when(v, date)
-            if holder != '0':
-                result[holder].append(n.val)
+            for date, holder in zip(dates, title_holder_when(v, dates)):
+                if holder != '0':
+                    result[date][holder].append(n.val)
     return result
 
 
@@ -100,16 +118,15 @@ def top_tier_titles(titles):
             return subset
 
 
-def title_holder_when(title_history, date):
-    holder = '0'
-    ticks = sorted(((n.val, v) for n, v in title_history
-                    if isinstance(n, ck3parser.Date) and n.val <= date),
-                   key=lambda x: x[0])
-    for date, tick in ticks:
+def title_holder_when(title_history, dates):
+    """return the holder of the title at each of the ascending dates"""
+    def apply(state, tick, date):
         for n, v in tick:
             if n.val == 'holder':
-                holder = str(v.val)
-    return holder
+                state['holder'] = str(v.val)
+
+    return timeline.replay(dated_ticks(title_history), dates, {'holder': '0'},
+                           apply, lambda state, date: state['holder'])
 
 
 def output(starts_by_trait):
@@ -6,7 +6,9 @@ import sys
 import numpy as np
 from PIL import Image
 from .ck3parser import rootpath, SimpleParser
+from .localpaths import cachedir
 from .print_time import print_time
+from .provincemap import MapAssets
 
 
 def parse_default_map(default_map_path):
@@ -32,16 +34,13 @@ def main():
     provinces_path = parser.file(map_data_paths['provinces'])
     width = parser.parse_file(
         'common/defines/graphic/00_graphics.txt')['NCamera']['PANNING_WIDTH'].val
-    image = Image.open(str(provinces_path))  # provinces.png
-    cropped = image.crop((0, 0, width, image.height))
-    a = np.array(cropped)
-    n = np.pad(a, ((1, 0), (0, 0), (0, 0)), 'edge')[:-1] # shifted south 1 pixel
-    w = np.pad(a, ((0, 0), (1, 0), (0, 0)), 'edge')[:, :-1]  # shifted east 1 pixel
-    nw = np.pad(a, ((1, 0), (1, 0), (0, 0)), 'edge')[:-1, :-1]  # shifted both 1 pixel
-    b = np.zeros((a.shape[0], a.shape[1], 4), np.uint8)  # output RGBA
-    mask = np.any((a != n) | (a != w) | (a != nw), axis=2) # get boolean mask of border pixels
-    mask[np.nonzero(np.all(a == 0, axis=2))] = True
-    b[:, :, 3][mask] = 255 # set border pixel transparency to opaque
+    definition_path = parser.file(map_data_paths['definitions'])
+    assets = MapAssets(cachedir / 'map_assets', provinces_path,
+                       definition_path)
+    # the border of a pixel only depends on the pixels north and west of it
+    borders = assets.borders[:, :width]
+    b = np.zeros(borders.shape + (4,), np.uint8)  # output RGBA
+    b[:, :, 3][borders] = 255 # set border pixel transparency to opaque
     out_image = Image.fromarray(b)
     mod = parser.moddirs[0].name.lower() + '_' if parser.moddirs else ''
     out_path = rootpath / (mod + 'ck3_borderlayer.png')
@@ -9,6 +9,7 @@ import PIL
 import PIL.Image
 from .ck3parser import SimpleParser, csv_rows, Date, Pair
 from .print_time import print_time
+from .timeline import Timeline, values_at
 
 EARLIEST_DATE = (float('-inf'),) * 3
 
@@ -112,23 +113,24 @@ def process_title_history(txts):
 
 # pre: provinces map, map adjacencies, title history
 def compute_higher_tier_adjacencies(when):
+    lieges = Title.lieges_at(when)
     for u, v in Title.province_graph.edges:
         try:
-            l_u, l_v = (Title.id_title_map[x].liege(when).codename for x in (u, v))
+            l_u, l_v = (lieges[Title.id_title_map[x].codename].codename for x in (u, v))
             if l_u is not l_v:
                 Title.county_graph.add_edge(l_u, l_v)
         except KeyError:
             pass
     for u, v in Title.county_graph.edges:
-        l_u, l_v = (Title.get(x).liege(when).codename for x in (u, v))
+        l_u, l_v = (lieges[x].codename for x in (u, v))
         if l_u is not l_v:
             Title.duchy_graph.add_edge(l_u, l_v)
     for u, v in Title.duchy_graph.edges:
-        l_u, l_v = (Title.get(x).liege(when).codename for x in (u, v))
+        l_u, l_v = (lieges[x].codename for x in (u, v))
         if l_u is not l_v:
             Title.kingdom_graph.add_edge(l_u, l_v)
     for u, v in Title.kingdom_graph.edges:
-        l_u, l_v = (Title.get(x).liege(when).codename for x in (u, v))
+        l_u, l_v = (lieges[x].codename for x in (u, v))
         if l_u is not l_v:
             Title.empire_graph.add_edge(l_u, l_v)
 
@@ -163,8 +165,9 @@ def duchy_cover(when):
 # maybe just try without connectivity just to see what we get since that might be all i can get
 def compute_clauses(when, duchy_literal_map):
     duchies_near_kingdom = defaultdict(set)
+    lieges = Title.lieges_at(when)
     for d, adj in Title.duchy_graph.adjacency():
-        k = Title.get(d).liege(when).codename
+        k = lieges[d].codename
         duchies_near_kingdom[k] |= {d} | set(adj)
     kingdom_clauses = [[duchy_literal_map[d] for d in s]
                        for s in duchies_near_kingdom.values()] # undefined sort order
@@ -223,7 +226,7 @@ class Title:
 
     def __init__(self, codename):
         self.codename = codename
-        self.lieges = {}
+        self.lieges = Timeline()
         Title.instances[codename] = self
         if g := Title.graph_by_tier.get(codename[0]):
             g.add_node(codename)
@@ -233,11 +236,14 @@ class Title:
         self.lieges[from_when] = liege
 
     def liege(self, when=EARLIEST_DATE):
-        try:
-            return self.lieges[max(date for date in self.lieges if
-                                   date <= when)]
-        except ValueError:
-            return None
+        return self.lieges.at(when)
+
+    @classmethod
+    def lieges_at(cls, when=EARLIEST_DATE):
+        """return a dict of the codename of every title to its liege at
+        when"""
+        return values_at({codename: title.lieges for codename, title in
+                          Title.instances.items()}, when)
 
 
 if __name__ == '__main__':
@@ -12,6 +12,8 @@ import networkx
 import numpy as np
 from .ck3parser import rootpath, SimpleParser, csv_rows
 from .print_time import print_time
+from .provincemap import (rgb_to_ids, report_unknown_colors, adjacencies,
+                          ProvinceStats)
 
 
 def read_game_data():
@@ -49,30 +51,19 @@ def read_game_data():
         name_id_map[row[4]] = province
 
     def parse_provinces_map(path, width, skip_provinces):
-        def province_id(rgb):
-            return rgb_id_map.get(tuple(rgb), 0)
-
-        coords = defaultdict(lambda: [0, 0, 0])
         image = PIL.Image.open(str(path))
         image = image.crop((0, 0, width, image.height))
         image = np.array(image)
-        for i, j in np.ndindex(image.shape[0] - 1, image.shape[1] - 1):
-            province = province_id(image[i, j])
-            coords[province][0] += j
-            coords[province][1] += i
-            coords[province][2] += 1
-            if province != 0 and province not in skip_provinces:
-                neighbor_x = province_id(image[i, j + 1])
-                neighbor_y = province_id(image[i + 1, j])
-                for neighbor in [neighbor_x, neighbor_y]:
-                    if neighbor != province and neighbor != 0 and neighbor not in skip_provinces:
-                        province_graph.add_edge(province, neighbor)
-
-        a = np.array(image).view(dtype='u1,u1,u1')[..., 0]
-        b = np.vectorize(lambda x: rgb_id_map[tuple(x)], otypes=[np.uint16])(a)
+        b, unknown = rgb_to_ids(image, rgb_id_map)
+        report_unknown_colors(image, unknown)
+        for a, c in adjacencies(b).tolist():
+            if (a != 0 and a not in skip_provinces and
+                c not in skip_provinces):
+                province_graph.add_edge(a, c)
+        stats = ProvinceStats(b)
         for p in province_graph:
-            c = coords[p]
-            province_graph.nodes[p]['center'] = c[0] // c[2], c[1] // c[2]
+            province_graph.nodes[p]['center'] = (int(stats.centroid_x[p]),
+                                                 int(stats.centroid_y[p]))
         return b
 
     def process_map_adjacencies_row(row):
@@ -16,6 +16,7 @@ import traceback
 from funcparserlib.lexer import make_tokenizer, Token
 from funcparserlib.parser import (some, a, maybe, many, finished, skip,
                                   oneplus, forward_decl, NoParseError)
+from .localisation import LocalisationIndex, yml_entries
 from .localpaths import rootpath, ck3dir, ck3cachedir
 
 try:
@@ -24,7 +25,10 @@ try:
 except ImportError:
     git_present = False
 
-VERSION = 1
+VERSION = 2
+
+# shared by every node without pre-comments until someone asks for the list
+NO_COMMENTS = ()
 
 csv.register_dialect('ckii', delimiter=';', doublequote=False,
                      quotechar='\0', quoting=csv.QUOTE_NONE, strict=True)
@@ -113,14 +117,11 @@ def files(glob, moddirs=(), basedir=ck3dir, reverse=False):
 #     return locs
 
 def localization():
-    localization_dict = {}
-    for path in (ck3dir / 'localization').glob('*_l_english.yml'):
-        with path.open(encoding='utf-8-sig') as f:
-            for line in f:
-                match = re.fullmatch(r'\s*([^#\s:]+):\d?\s*"(.*)"[^"]*', line)
-                if match:
-                    localization_dict[match.group(1)] = match.group(2)
-    return localization_dict
+    """return the LocalisationIndex of the english localization"""
+    return LocalisationIndex(
+        ck3cachedir / 'localization',
+        sorted((ck3dir / 'localization').glob('*_l_english.yml')),
+        yml_entries, later_wins=True)
 
 def static_values(parser):
     static_values_dict = {}
@@ -213,6 +214,12 @@ class Comment:
     def __str__(self):
         return ('# ' if self.val and self.val[0] != '#' else '#') + self.val
 
+    def __getstate__(self):
+        return self.val
+
+    def __setstate__(self, state):
+        self.val = state
+
 
 class Stringifiable:
     __slots__ = ()
@@ -232,6 +239,14 @@ class TopLevel(Stringifiable):
         else:
             self.post_comments = [Comment(s) for s in post_comments]
         self._dictionary = None
+        self.settings = None
+
+    def __getstate__(self):
+        return self.contents, self.post_comments, self.settings
+
+    def __setstate__(self, state):
+        self.contents, self.post_comments, self.settings = state
+        self._dictionary = None
 
     def __len__(self):
         return len(self.contents)
@@ -314,12 +329,12 @@ class TopLevel(Stringifiable):
 
 
 class Commented(Stringifiable):
-    __slots__ = 'pre_comments', 'val', 'post_comment'
+    __slots__ = '_pre_comments', 'val', 'post_comment'
 
     def __init__(self, *args):
         super().__init__()
         if len(args) == 3:
-            self.pre_comments = [Comment(s) for s in args[0]]
+            self._pre_comments = [Comment(s) for s in args[0]] or NO_COMMENTS
             self.val = self.str_to_val(args[1])
             self.post_comment = Comment(args[2]) if args[2] else None
         elif len(args) == 2:
@@ -330,13 +345,29 @@ class Commented(Stringifiable):
                 self.val = args[0]
             self.post_comment = args[1].post_comment
         else:
-            self.pre_comments = []
+            self._pre_comments = NO_COMMENTS
             self.val = self.str_to_val(args[0])
             self.post_comment = None
 
+    def __getstate__(self):
+        return self._pre_comments, self.val, self.post_comment
+
+    def __setstate__(self, state):
+        self._pre_comments, self.val, self.post_comment = state
+
+    @property
+    def pre_comments(self):
+        if self._pre_comments is NO_COMMENTS:
+            self._pre_comments = []
+        return self._pre_comments
+
+    @pre_comments.setter
+    def pre_comments(self, value):
+        self._pre_comments = value
+
     @property
     def has_comments(self):
-        return self.pre_comments or self.post_comment
+        return self._pre_comments or self.post_comment
 
     def str_to_val(self, string):
         return string
@@ -351,7 +382,7 @@ class Commented(Stringifiable):
     def str(self, parser, indent=0):
         s = ''
         indent_str = '\t' if parser.tab_indents else ' ' * parser.indent_width
-        if self.pre_comments:
+        if self._pre_comments:
             s += indent * indent_str
             s += comments_to_str(parser, self.pre_comments, indent)
         s += indent * indent_str + self.val_str()
@@ -365,7 +396,7 @@ class Commented(Stringifiable):
         indent_str = '\t' if parser.tab_indents else ' ' * parser.indent_width
         sep = '\n' + indent * indent_str
         s = ''
-        if self.pre_comments:
+        if self._pre_comments:
             if col > indent * parser.indent_width:
                 s += sep
                 nl += 1
@@ -398,6 +429,17 @@ class String(Commented):
         super().__init__(*args)
         self.force_quote = False
 
+    def __getstate__(self):
+        return super().__getstate__() + (self.force_quote,)
+
+    def __setstate__(self, state):
+        super().__setstate__(state[:3])
+        self.force_quote = state[3]
+
+    def str_to_val(self, string):
+        # keys repeat endlessly across a tree; share one object per spelling
+        return sys.intern(string) if type(string) is str else string
+
     def val_str(self):
         s = self.val
         if self.force_quote or not re.fullmatch(r'\S+', s):
@@ -406,6 +448,7 @@ class String(Commented):
 
 
 class Number(Commented):
+    __slots__ = ()
 
     def str_to_val(self, string):
         try:
@@ -415,6 +458,7 @@ class Number(Commented):
 
 
 class Date(Commented):
+    __slots__ = ()
 
     def str_to_val(self, string):
         return tuple((int(x) if x else 0) for x in string.split('.'))
@@ -424,7 +468,7 @@ class Date(Commented):
 
 
 class Op(Commented):
-    pass
+    __slots__ = ()
 
 
 class Pair(Stringifiable):
@@ -456,6 +500,12 @@ class Pair(Stringifiable):
             self.op = Op('=')
             self.value = Obj([])
 
+    def __getstate__(self):
+        return self.key, self.op, self.value
+
+    def __setstate__(self, state):
+        self.key, self.op, self.value = state
+
     def __iter__(self):
         yield self.key
         yield self.value
@@ -550,6 +600,13 @@ class Obj(Stringifiable):
             self.ker = ker if ker is not None else Op('}')
         self._dictionary = None
 
+    def __getstate__(self):
+        return self.kel, self.contents, self.ker
+
+    def __setstate__(self, state):
+        self.kel, self.contents, self.ker = state
+        self._dictionary = None
+
     def __len__(self):
         return len(self.contents)
 
@@ -618,7 +675,7 @@ class Obj(Stringifiable):
         return s
 
     def might_fit_on_line(self, parser, indent):
-        if self.kel.has_comments or self.ker.pre_comments:
+        if self.kel.has_comments or self.ker._pre_comments:
             return False
         if self.contents and isinstance(self.contents[0], Pair):
             return (len(self) == 1 and not self.contents[0].has_comments and
@@ -939,6 +996,9 @@ class SimpleParser:
                             return tree
             # except AttributeError:
             #     pass
+            except (TypeError, ValueError):
+                # pickled by an older, differently shaped version of a class
+                pass
             except (pickle.PickleError, EOFError, ImportError, IndexError,
                     AttributeError):
                 print('Error retrieving cache for {}'.format(path),
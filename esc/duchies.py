@@ -31,6 +31,8 @@ import PIL
 import PIL.Image
 import tabulate
 from . import ck2parser
+from . import provincemap
+from .timeline import Timeline, values_at
 
 rootpath = ck2parser.rootpath
 
@@ -125,11 +127,12 @@ class Title:
 
     def __init__(self, codename):
         self.codename = codename
-        self.lieges = {}
-        self.vassal_intvls = collections.defaultdict(list)
-        self.builts = {}
-        self.cultures = {}
-        self.religions = {}
+        self.lieges = Timeline()
+        # vassal to the start date of each of its intervals under this title
+        self.vassal_intvls = collections.defaultdict(dict)
+        self.builts = Timeline()
+        self.cultures = Timeline()
+        self.religions = Timeline()
         self.name = localisation.get(codename, codename)
         self.other_names = []
         self.neighbors = []
@@ -161,11 +164,7 @@ class Title:
         self.builts[from_when] = False
 
     def built(self, when=EARLIEST_DATE):
-        try:
-            return self.builts[max(date for date in self.builts if
-                                   date <= when)]
-        except ValueError:
-            return False
+        return self.builts.at(when, False)
 
     def built_holdings(self, when=EARLIEST_DATE):
         return (t for t in self.vassals(when) if t.built(when))
@@ -177,41 +176,38 @@ class Title:
             liege = self.liege()
         prev_liege = self.liege(from_when)
         if prev_liege is not None:
-            intvl = next(intvl for intvl in prev_liege.vassal_intvls[self] if
-                         from_when in intvl)
-            intvl.stop = from_when
+            prev_start = self.lieges.start(from_when)
+            prev_liege.vassal_intvls[self][prev_start].stop = from_when
         self.lieges[from_when] = liege
-        to_when = min((date for date in self.lieges if date > from_when),
-                      default=LATEST_DATE)
+        to_when = self.lieges.next_date(from_when, LATEST_DATE)
         if liege is not None:
-            liege.vassal_intvls[self].append(Interval(from_when, to_when))
+            liege.vassal_intvls[self][from_when] = Interval(from_when, to_when)
 
     def liege(self, when=EARLIEST_DATE):
-        try:
-            return self.lieges[max(date for date in self.lieges if
-                                   date <= when)]
-        except ValueError:
-            return None
+        return self.lieges.at(when)
+
+    @classmethod
+    def lieges_at(cls, when=EARLIEST_DATE):
+        """return a dict of the codename of every title to its liege at
+        when"""
+        return values_at({codename: title.lieges for codename, title in
+                          Title.instances.items()}, when)
 
     def culture(self, when=EARLIEST_DATE):
-        try:
-            culture = self.cultures[max(date for date in self.cultures if
-                                    date <= when)]
-        except ValueError:
+        culture = self.cultures.at(when)
+        if culture is None:
             return None
         return localisation.get(culture, culture)
 
     def religion(self, when=EARLIEST_DATE):
-        try:
-            religion = self.religions[max(date for date in self.religions if
-                                      date <= when)]
-        except ValueError:
+        religion = self.religions.at(when)
+        if religion is None:
             return None
         return localisation.get(religion, religion)
 
     def vassals(self, when=EARLIEST_DATE):
         return (title for title, intvls in self.vassal_intvls.items() if
-                any(when in intvl for intvl in intvls))
+                any(when in intvl for intvl in intvls.values()))
 
     def coastal(self):
         return any(x in Title.seas for x in Title.province_graph[self.id])
@@ -422,20 +418,12 @@ def process_map_definitions_row(row):
         Title.id_name_map[province] = row[4]
 
 # pre: process map definitions
-def parse_map_provinces(path):
-    def province_id(rgb):
-        return Title.rgb_id_map.get(tuple(rgb), 0)
-
-    image = PIL.Image.open(str(path))
-    image = numpy.array(image)
-    for i, j in numpy.ndindex(image.shape[0] - 1, image.shape[1] - 1):
-        province = province_id(image[i, j])
+def parse_map_provinces(path, definitions_path):
+    assets = provincemap.MapAssets(ck2parser.cachedir / 'map_assets', path,
+                                   definitions_path, Title.rgb_id_map)
+    for province, neighbor in assets.edges.tolist():
         if province != 0:
-            neighbor_x = province_id(image[i, j + 1])
-            neighbor_y = province_id(image[i + 1, j])
-            for neighbor in [neighbor_x, neighbor_y]:
-                if neighbor != province and neighbor != 0:
-                    Title.province_graph.add_edge(province, neighbor)
+            Title.province_graph.add_edge(province, neighbor)
     seas_lakes = Title.province_graph.subgraph(Title.waters - Title.rivers)
     Title.seas = {x for x in seas_lakes if seas_lakes[x]}
 
@@ -791,10 +779,11 @@ def duchy_path():
         'd_marrakech', 'd_fes', 'd_tangiers', 'd_tlemcen', 'd_alger', 'd_kabylia', 'd_tunis', 'd_tripolitania', 'd_cyrenaica', 'd_alexandria', 'd_damietta', 'd_cairo', 'd_aswan'
     }
     when = 867, 1, 1
+    lieges = Title.lieges_at(when)
     for u, v in Title.province_graph.edges():
         try:
-            d_u = Title.id_title_map[u].liege(when).codename
-            d_v = Title.id_title_map[v].liege(when).codename
+            d_u = lieges[Title.id_title_map[u].codename].codename
+            d_v = lieges[Title.id_title_map[v].codename].codename
         except KeyError:
             continue
         if d_u in start_region:
@@ -852,7 +841,7 @@ def main():
     map_definitions, map_provinces, map_adjacencies = (
         process_default_map(default_map))
     parse_csv(map_definitions, process_map_definitions_row)
-    parse_map_provinces(map_provinces)
+    parse_map_provinces(map_provinces, map_definitions)
     parse_csv(map_adjacencies, process_map_adjacencies_row)
 
     # old scraps:
@@ -1,13 +1,18 @@
+import hashlib
+import importlib
+import inspect
+import os
 import pickle
 import numpy
-from functools import wraps
+from functools import wraps, lru_cache
+from pathlib import Path
+from ck2parser import files
 from eu4.paths import eu4cachedir
 
 try:
-    from functools import cached_property
+    from functools import cached_property as _cached_property
 except: # for backwards compatibility with python versions < 3.8
-    from functools import lru_cache
-    def cached_property(f):
+    def _cached_property(f):
         return property(lru_cache()(f))
 
 
@@ -41,12 +46,148 @@ class NumpySerializer:
         return numpy.load(filename)
 
 
+# the dependencies of the disk_cache entries which are being computed at the moment, outermost first
+_recording = []
+# (module, qualname) of every function decorated with disk_cache to the function
+_functions = {}
+
+
+def new_dependencies():
+    """return an empty dependency record
+
+    files maps paths to (size, mtime_ns, digest) or None until the file is stamped,
+    globs maps (glob, basedir, moddirs) to the sorted paths which it matched and
+    functions maps the (module, qualname) of disk_cache functions to a hash of their source
+    """
+    return {'files': {}, 'globs': {}, 'functions': {}}
+
+
+def record_file(path):
+    """note that the disk_cache entries which are being computed read the file path"""
+    if _recording:
+        path = str(path)
+        for dependencies in _recording:
+            dependencies['files'].setdefault(path, None)
+
+
+def record_glob(glob, basedir, moddirs=()):
+    """note that the disk_cache entries which are being computed depend on which files glob matches"""
+    if _recording:
+        key = glob, str(basedir), tuple(str(moddir) for moddir in moddirs)
+        for dependencies in _recording:
+            dependencies['globs'].setdefault(key, None)
+
+
+def _add_dependencies(other):
+    """merge the dependencies of an entry which is used while computing other entries"""
+    for dependencies in _recording:
+        for kind, values in other.items():
+            for k, v in values.items():
+                if dependencies[kind].get(k) is None:
+                    dependencies[kind][k] = v
+
+
+def _glob_paths(key):
+    glob, basedir, moddirs = key
+    return [str(path) for path in files(glob, [Path(moddir) for moddir in moddirs], Path(basedir))]
+
+
+def file_digest(path):
+    """return a hash of the content of the file path"""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _file_stamp(path):
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns, file_digest(path)
+
+
+@lru_cache(maxsize=None)
+def source_digest(f):
+    """return a hash of the source code of the function or class f"""
+    return hashlib.blake2b(inspect.getsource(f).encode(), digest_size=16).hexdigest()
+
+
+def _function(key):
+    if key not in _functions:
+        try:
+            importlib.import_module(key[0])
+        except ImportError:
+            pass
+    return _functions.get(key)
+
+
+def _stamp(dependencies):
+    """fill in the file stamps and glob matches which were only noted during the computation"""
+    for path, stamp in dependencies['files'].items():
+        if stamp is None:
+            dependencies['files'][path] = _file_stamp(path)
+    for key, paths in dependencies['globs'].items():
+        if paths is None:
+            dependencies['globs'][key] = _glob_paths(key)
+
+
+def stale_reasons(dependencies):
+    """return the reasons why an entry with these dependencies has to be computed again
+
+    an empty list means that the entry is up to date. Files whose modification time changed,
+    but whose content is the same, get a new stamp in dependencies
+    """
+    reasons = []
+    for key, digest in dependencies['functions'].items():
+        f = _function(key)
+        if f is None:
+            reasons.append('{}.{} no longer exists'.format(*key))
+        elif source_digest(f) != digest:
+            reasons.append('the code of {}.{} changed'.format(*key))
+    for key, paths in dependencies['globs'].items():
+        if _glob_paths(key) != paths:
+            reasons.append('the files matching {} changed'.format(key[0]))
+    for path, (size, mtime_ns, digest) in dependencies['files'].items():
+        try:
+            stat = os.stat(path)
+        except OSError:
+            reasons.append('{} was removed'.format(path))
+            continue
+        if (stat.st_size, stat.st_mtime_ns) == (size, mtime_ns):
+            continue
+        if stat.st_size != size or file_digest(path) != digest:
+            reasons.append('{} changed'.format(path))
+        else:
+            dependencies['files'][path] = stat.st_size, stat.st_mtime_ns, digest
+    return reasons
+
+
+def _dependencies_path(cachefile):
+    return cachefile.with_name(cachefile.name + '.deps')
+
+
+def load_dependencies(cachefile):
+    """return the dependency record of the cache file or None if there is none"""
+    try:
+        with open(_dependencies_path(cachefile), 'rb') as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+
+
+def save_dependencies(cachefile, dependencies):
+    with open(_dependencies_path(cachefile), 'wb') as f:
+        pickle.dump(dependencies, f, pickle.HIGHEST_PROTOCOL)
+
+
 def disk_cache(serializer=PickleSerializer):
     """Cache the method result on disk
 
-    Warning: the cache assumes that the return value does not change
-    as long as the eu4 version stays the same. When changing the code
-    of the decorated method, you have to clear the cache manually
+    Each entry remembers the game files which were read through the parser of the instance
+    (see eu4.parser.DependencyTrackingParser), the files in the instance's disk_cache_files,
+    the globs which were used to find files and a hash of the source of the method. Values
+    from other disk_cache methods which are used in the computation add their dependencies as
+    well. If any of these changed, the entry is computed again.
 
     setting eu4cachedir to None disables the cache, but it doesn't clear it
     """
@@ -54,16 +195,97 @@ def disk_cache(serializer=PickleSerializer):
         if not eu4cachedir:
             return f
 
-        @wraps(f)
-        def wrapper(self):
+        key = f.__module__, f.__qualname__
+        _functions[key] = f
+
+        def load_or_compute(self):
             cachedir_with_module = eu4cachedir / f.__module__
             cachedir_with_module.mkdir(parents=True, exist_ok=True)
             cachefile = cachedir_with_module / (f.__name__ + '.' + serializer.get_file_extension())
             if cachefile.exists():
-                return serializer.deserialize(cachefile)
-            else:
+                dependencies = load_dependencies(cachefile)
+                if dependencies is not None:
+                    files_before = dict(dependencies['files'])
+                    if not stale_reasons(dependencies):
+                        if dependencies['files'] != files_before:
+                            save_dependencies(cachefile, dependencies)
+                        return serializer.deserialize(cachefile), dependencies
+            dependencies = new_dependencies()
+            for path in getattr(self, 'disk_cache_files', ()):
+                dependencies['files'][str(path)] = None
+            dependencies['functions'][key] = source_digest(f)
+            _recording.append(dependencies)
+            try:
                 return_value = f(self)
-                serializer.serialize(return_value, cachefile)
-                return return_value
+            finally:
+                _recording.pop()
+            _stamp(dependencies)
+            serializer.serialize(return_value, cachefile)
+            save_dependencies(cachefile, dependencies)
+            return return_value, dependencies
+
+        def with_dependencies(self):
+            return_value, dependencies = load_or_compute(self)
+            _add_dependencies(dependencies)
+            return return_value, dependencies
+
+        @wraps(f)
+        def wrapper(self):
+            return with_dependencies(self)[0]
+        wrapper.with_dependencies = with_dependencies
         return wrapper
     return decorating_function
+
+
+class _DiskCachedProperty:
+    """cached_property for disk_cache methods
+
+    unlike functools.cached_property, it runs on every access, so that disk_cache entries
+    which are computed with the value depend on it even if it was already in memory
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self.__doc__ = f.__doc__
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        try:
+            return_value, dependencies = instance.__dict__[self.name]
+        except KeyError:
+            return_value, dependencies = instance.__dict__[self.name] = self.f.with_dependencies(instance)
+        else:
+            _add_dependencies(dependencies)
+        return return_value
+
+    def __set__(self, instance, value):
+        raise AttributeError("can't set attribute {}".format(self.name))
+
+
+def cached_property(f):
+    if hasattr(f, 'with_dependencies'):
+        return _DiskCachedProperty(f)
+    return _cached_property(f)
+
+
+def cache_entries():
+    """yield (cachefile, size in bytes, reasons why it would be computed again) for each disk_cache entry
+
+    other files in eu4cachedir, which have no dependency record, are not disk_cache entries
+    """
+    if not eu4cachedir or not eu4cachedir.exists():
+        return
+    for cachefile in sorted(eu4cachedir.glob('*/*')):
+        if (cachefile.suffix == '.deps' or not cachefile.is_file() or
+                not _dependencies_path(cachefile).exists()):
+            continue
+        dependencies = load_dependencies(cachefile)
+        if dependencies is None:
+            reasons = ['the dependency record is unreadable']
+        else:
+            reasons = stale_reasons(dependencies)
+        yield cachefile, cachefile.stat().st_size, reasons
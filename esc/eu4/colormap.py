@@ -1,13 +1,13 @@
 #!/usr/bin/env python3
 
+import math
+from contextlib import contextmanager
 import numpy as np
-from PIL import Image
-from localpaths import rootpath
 from colormath import color_objects
-from _collections import OrderedDict
 from eu4.cache import cached_property
 from eu4.paths import eu4outpath
 from eu4.mapparser import Eu4MapParser
+from eu4.maprender import MapBatch, render_map
 
 
 class ColorMapGenerator:
@@ -44,8 +44,8 @@ class ColorMapGenerator:
         self.outpath = eu4outpath
         self.contains = {}
 
-        # caching the border image
-        self._borderlayer = None
+        # the MapBatch which collects the maps while batch_rendering is active
+        self.batch = None
 
         # to check that one name isn't used for multiple things. e.g. an area and region with the same internal name
         self.name_to_type = {}
@@ -125,76 +125,121 @@ class ColorMapGenerator:
 
     def calculate_boundaries(self, province_list, margin=10):
         """ calculate the min_x, max_x, min_y, max_y of the given provinces on the map and add a margin"""
-        c = np.isin(self.mapparser.positions_to_provinceID_array, province_list).nonzero()
-
-        min_y = c[0].min() - margin
-        min_x = c[1].min() - margin
-        max_y = c[0].max() + margin
-        max_x = c[1].max() + margin
-
-        # make sure the max and min values are not outside the image
-        min_y = max(0, min_y)
-        min_x = max(0, min_x)
-        max_y = min(self.mapparser.positions_to_provinceID_array.shape[0] - 1, max_y)
-        max_x = min(self.mapparser.positions_to_provinceID_array.shape[1] - 1, max_x)
-
-        return min_x, max_x, min_y, max_y
+        # the margin is clipped so that the values are not outside the image
+        return self.mapparser.province_stats.bounds(province_list, margin)
 
     def generate_mapimage_with_several_colors(self, color_to_provinces, name='', crop_to_color=None, margin=10):
         out_path = self.outpath / '{}.png'.format(name)
-        self.generate_mapimage_object_with_several_colors(color_to_provinces, crop_to_color, margin).save(str(out_path))
+        self.save_map(out_path, *self.several_colors_lut_and_box(color_to_provinces, crop_to_color, margin))
+
+    @cached_property
+    def borderlayer(self):
+        """RGBA array of the province borders"""
+        return np.asarray(self.mapparser.map_assets.border_image())
+
+    @contextmanager
+    def batch_rendering(self, workers=None):
+        """queue the maps which are generated in the with block and render them all at the end in parallel
+
+        workers is the number of processes and defaults to the number of cpus. Code which needs
+        the finished images has to be passed to defer
+        """
+        batch = self.batch = MapBatch(workers)
+        try:
+            yield batch
+        finally:
+            self.batch = None
+        batch.run(self.mapparser.positions_to_provinceID_array, self.borderlayer)
+
+    def defer(self, f):
+        """call f after the current batch has been rendered or right away if there is no batch"""
+        if self.batch is not None:
+            self.batch.defer(f)
+        else:
+            f()
 
-    def add_province_borders(self, out):
-        if not self._borderlayer:
-            borders_path = rootpath / 'eu4borderlayer.png'
-            self._borderlayer = Image.open(str(borders_path))
-        out.paste(self._borderlayer, mask=self._borderlayer)
+    def save_map(self, out_path, lut, box, stripe_width=3):
+        if self.batch is not None:
+            self.batch.add(out_path, lut, box, stripe_width)
+        else:
+            self.render(lut, box, stripe_width).save(str(out_path))
+
+    def render(self, lut, box, stripe_width=3):
+        return render_map(self.mapparser.positions_to_provinceID_array, self.borderlayer, lut, box, stripe_width)
+
+    def get_provinces(self, provinceIdList):
+        """expand the names of groupings and ids (as int or str) to a set of provinceIDs"""
+        if isinstance(provinceIdList, str):
+            provinceIdList = provinceIdList.split()
+        return {y for x in provinceIdList for y in (self.get_contains_dict().get(x, None) or (int(x),))}
+
+    def crop_box(self, crop_to_provinces=None, margin=10):
+        """the (left, upper, right, lower) box of the part of the map which shows crop_to_provinces
+
+        the box covers the whole map if crop_to_provinces is empty. it is worked out from the
+        province bounds before rendering, so that only the part inside the box gets rendered
+        """
+        if crop_to_provinces:
+            min_x, max_x, min_y, max_y = self.calculate_boundaries(crop_to_provinces, margin)
+            # pillow boxes exclude the bottom row and rightmost
+            # column of pixels, so we have to add 1 to include them
+            return min_x, min_y, max_x + 1, max_y + 1
+        height, width = self.mapparser.positions_to_provinceID_array.shape
+        return 0, 0, width, height
 
     def generate_mapimage_object_with_several_colors(self, color_to_provinces, crop_to_color=None, margin=10):
+        return self.render(*self.several_colors_lut_and_box(color_to_provinces, crop_to_color, margin))
+
+    def several_colors_lut_and_box(self, color_to_provinces, crop_to_color=None, margin=10):
         prov_color_lut = np.copy(self.prov_color_lut_base)
 
         provinces_used_for_cropping = []
         for category in color_to_provinces:
-            provinceIdList = color_to_provinces[category]
-            if isinstance(provinceIdList, str):
-                provinceIdList = provinceIdList.split()
-            provs = {y for x in provinceIdList for y in (self.get_contains_dict().get(x, None) or (int(x),))}
+            provs = self.get_provinces(color_to_provinces[category])
             if crop_to_color == category or crop_to_color == True:  # true means to include all colored provinces
                 provinces_used_for_cropping.extend(provs)
             for prov in provs:
                 prov_color_lut[prov] = self.convert_color_to_np_type(category)
 
-        out_a = prov_color_lut[self.mapparser.positions_to_provinceID_array]
-        out = Image.fromarray(out_a)
-        self.add_province_borders(out)
+        return prov_color_lut, self.crop_box(provinces_used_for_cropping if crop_to_color else None, margin)
 
-        if crop_to_color:
-            min_x, max_x, min_y, max_y = self.calculate_boundaries(provinces_used_for_cropping, margin)
-            # for some reason, pillow excludes the bottom row and rightmost
-            # column of pixels when cropping, so we have to add 1 to include them
-            out = out.crop((min_x, min_y, max_x + 1, max_y + 1))
+    def generate_shaded_mapimage_object(self, color_to_provinces, color_to_provinces_without_shading=None,
+                                        crop_to_color=None, margin=10, stripe_width=3):
+        """provinces which are in several categories of color_to_provinces get diagonal stripes
+        in the colors of all of them. the categories in color_to_provinces_without_shading
+        are drawn in a solid color on top of that
+        """
+        return self.render(*self.shaded_luts_and_box(color_to_provinces, color_to_provinces_without_shading,
+                                                     crop_to_color, margin), stripe_width)
 
-        return out
+    def shaded_luts_and_box(self, color_to_provinces, color_to_provinces_without_shading=None,
+                            crop_to_color=None, margin=10):
+        """one color lookup table per stripe and the crop box for generate_shaded_mapimage_object"""
+        province_to_colors = {}
+        provinces_used_for_cropping = []
+        for category, provinceIdList in color_to_provinces.items():
+            provs = self.get_provinces(provinceIdList)
+            if crop_to_color == category or crop_to_color == True:  # true means to include all colored provinces
+                provinces_used_for_cropping.extend(provs)
+            for prov in provs:
+                province_to_colors.setdefault(prov, []).append(self.convert_color_to_np_type(category))
+        # enough stripes that every province gets an equal share for each of its colors
+        stripes = math.lcm(1, *{len(colors) for colors in province_to_colors.values()})
+        luts = np.repeat(self.prov_color_lut_base[np.newaxis], stripes, axis=0)
+        for prov, colors in province_to_colors.items():
+            # with two colors, the stripe at the top left corner has the color of the later category
+            for stripe in range(stripes):
+                luts[stripe, prov] = colors[-1 - stripe % len(colors)]
+        for category, provinceIdList in (color_to_provinces_without_shading or {}).items():
+            provs = self.get_provinces(provinceIdList)
+            if crop_to_color == category or crop_to_color == True:
+                provinces_used_for_cropping.extend(provs)
+            luts[:, list(provs)] = self.convert_color_to_np_type(category)
+
+        return luts, self.crop_box(provinces_used_for_cropping if crop_to_color else None, margin)
 
     def create_shaded_image(self, color_to_provinces, color_to_provinces_without_shading=None, name='',
                             crop_to_color=None, margin=10):
-        color_first_image = color_to_provinces.copy()
-        color_second_image = OrderedDict(reversed(list(color_to_provinces.items())))
-        if color_to_provinces_without_shading:
-            for k, v in color_to_provinces_without_shading.items():
-                color_first_image[k] = v
-                color_second_image[k] = v
-        first_image = self.generate_mapimage_object_with_several_colors(color_first_image, crop_to_color, margin)
-        second_image = self.generate_mapimage_object_with_several_colors(color_second_image, crop_to_color, margin)
-        shaded_image = Image.new(first_image.mode, first_image.size)
-        for x in range(first_image.width):
-            for y in range(first_image.height):
-                if (x+y) % 6 < 3:
-                    source_image_for_current_pixel = first_image
-                else:
-                    source_image_for_current_pixel = second_image
-
-                shaded_image.putpixel((x, y), source_image_for_current_pixel.getpixel((x, y)))
-
         out_path = self.outpath / '{}.png'.format(name)
-        shaded_image.save(str(out_path))
+        self.save_map(out_path, *self.shaded_luts_and_box(
+            color_to_provinces, color_to_provinces_without_shading, crop_to_color, margin))
@@ -138,17 +138,11 @@ class Area(NameableEntityWithProvinces):
 
     @cached_property
     def contains_land_provinces(self):
-        for province in self.provinces:
-            if province.type == 'Land':
-                return True
-        return False
+        return self.parser.geography.any_member('area', self.name, type='Land')
 
     @cached_property
     def contains_inland_seas(self):
-        for province in self.provinces:
-            if province.type == 'Inland sea':
-                return True
-        return False
+        return self.parser.geography.any_member('area', self.name, type='Inland sea')
 
 
 class Region(NameableEntity):
@@ -173,25 +167,16 @@ class Region(NameableEntity):
 
     @cached_property
     def contains_land_provinces(self):
-        for area in self.areas:
-            if area.contains_land_provinces:
-                return True
-        return False
+        return self.parser.geography.any_member('region', self.name, type='Land')
 
     @cached_property
     def contains_inland_seas(self):
-        for area in self.areas:
-            if area.contains_inland_seas:
-                return True
-        return False
+        return self.parser.geography.any_member('region', self.name, type='Inland sea')
 
     @cached_property
     def provinceIDs(self):
         if self._provinceIDs is None:
-            self._provinceIDs = []
-            #             [provinceID for area in self.areas for provinceID in area.provinceIDs ]
-            for area in self.areas:
-                self._provinceIDs.extend(area.provinceIDs)
+            self._provinceIDs = self.parser.geography.members('region', self.name).tolist()
         return self._provinceIDs
 
     @cached_property
@@ -215,10 +200,7 @@ class Superregion(NameableEntity):
 
     @cached_property
     def contains_land_provinces(self):
-        for region in self.regions:
-            if region.contains_land_provinces:
-                return True
-        return False
+        return self.parser.geography.any_member('superregion', self.name, type='Land')
 
 
 class ColonialRegion(NameableEntityWithProvincesAndColor):
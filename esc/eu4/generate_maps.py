@@ -1,7 +1,6 @@
 #!/usr/bin/env python3
 import os
 import sys
-import re
 import numpy as np
 from PIL import Image
 from pathlib import Path
@@ -89,26 +88,41 @@ class MapGenerator:
         self.color_map_generator.generate_mapimage_with_several_colors(color_to_superregion, 'Superregion map')
 
     def region_maps(self):
+        geography = self.mapparser.geography
+        land = geography.mask('type', 'Land')
+
+        def land_provinces(mask):
+            return np.flatnonzero(land & mask).tolist()
+
+        def in_superregions(*names):
+            return geography.mask('superregion', names)
+
+        def in_regions(*names):
+            return geography.mask('region', names)
+
+        def in_continents(*names):
+            return geography.mask('continent', names)
+
         maps_to_generate = {
-            'Superregion india': [prov.id for prov in self.mapparser.all_land_provinces.values() if prov.superregion.name == 'india_superregion'],
-            'Superregion east indies': [prov.id for prov in self.mapparser.all_land_provinces.values() if prov.superregion.name == 'east_indies_superregion'],
-            'Oceanian regions': [prov.id for prov in self.mapparser.all_land_provinces.values() if prov.continent.name == 'oceania'],
-            'Asian regions': [prov.id for prov in self.mapparser.all_land_provinces.values() if prov.continent.name == 'asia' and prov.superregion.name not in ['india_superregion', 'east_indies_superregion']],
-            'European regions': [prov.id for prov in self.mapparser.all_land_provinces.values() if prov.continent.name == 'europe'],
-            'Superregion africa': [prov.id for prov in self.mapparser.all_land_provinces.values() if prov.continent.name == 'africa'],
-            'Superregion south america': [prov.id for prov in self.mapparser.all_land_provinces.values() if prov.continent.name == 'south_america'],
-            'North American regions': [prov.id for prov in self.mapparser.all_land_provinces.values() if prov.continent.name == 'north_america'],
-            'Africa northern regions': [prov.id for prov in self.mapparser.all_land_provinces.values() if prov.superregion.name == 'africa_superregion' or prov.region.name == 'egypt_region'],
-            'Africa southern regions': [prov.id for prov in self.mapparser.all_land_provinces.values() if prov.superregion.name == 'southern_africa_superregion'],
-            'Europe central regions': [prov.id for prov in self.mapparser.all_land_provinces.values() if prov.region.name in ['scandinavia_region', 'north_german_region', 'south_german_region', 'italy_region']],
-            'Europe western regions': [prov.id for prov in self.mapparser.all_land_provinces.values() if prov.region.name in ['france_region', 'iberia_region', 'british_isles_region', 'low_countries_region']],
-            'Middle East regions': [prov.id for prov in self.mapparser.all_land_provinces.values() if prov.superregion.name in ['persia_superregion', 'near_east_superregion'] and prov.region.name != 'egypt_region'],
-            'Superregion Central and South America': [prov.id for prov in self.mapparser.all_land_provinces.values() if prov.superregion.name in ['south_america_superregion', 'andes_superregion', 'central_america_superregion'] and prov.region.name not in ['rio_grande_region', 'california_region']],
-            'Superregion china far east': [prov.id for prov in self.mapparser.all_land_provinces.values() if prov.superregion.name in ['china_superregion', 'far_east_superregion'] and prov.region.name not in ['manchuria_region']],
-            'Superregion east europe': [prov.id for prov in self.mapparser.all_land_provinces.values() if prov.superregion.name in ['eastern_europe_superregion'] and prov.region.name not in ['manchuria_region']],
-            'Superregion north america': [prov.id for prov in self.mapparser.all_land_provinces.values() if prov.superregion.name == 'north_america_superregion' or prov.region.name in['rio_grande_region', 'california_region']],
-            'Superregion tartary': [prov.id for prov in self.mapparser.all_land_provinces.values() if prov.superregion.name == 'tartary_superregion' or prov.region.name in['manchuria_region']],
-            'Region map':  [prov.id for prov in self.mapparser.all_land_provinces.values()],
+            'Superregion india': land_provinces(in_superregions('india_superregion')),
+            'Superregion east indies': land_provinces(in_superregions('east_indies_superregion')),
+            'Oceanian regions': land_provinces(in_continents('oceania')),
+            'Asian regions': land_provinces(in_continents('asia') & ~in_superregions('india_superregion', 'east_indies_superregion')),
+            'European regions': land_provinces(in_continents('europe')),
+            'Superregion africa': land_provinces(in_continents('africa')),
+            'Superregion south america': land_provinces(in_continents('south_america')),
+            'North American regions': land_provinces(in_continents('north_america')),
+            'Africa northern regions': land_provinces(in_superregions('africa_superregion') | in_regions('egypt_region')),
+            'Africa southern regions': land_provinces(in_superregions('southern_africa_superregion')),
+            'Europe central regions': land_provinces(in_regions('scandinavia_region', 'north_german_region', 'south_german_region', 'italy_region')),
+            'Europe western regions': land_provinces(in_regions('france_region', 'iberia_region', 'british_isles_region', 'low_countries_region')),
+            'Middle East regions': land_provinces(in_superregions('persia_superregion', 'near_east_superregion') & ~in_regions('egypt_region')),
+            'Superregion Central and South America': land_provinces(in_superregions('south_america_superregion', 'andes_superregion', 'central_america_superregion') & ~in_regions('rio_grande_region', 'california_region')),
+            'Superregion china far east': land_provinces(in_superregions('china_superregion', 'far_east_superregion') & ~in_regions('manchuria_region')),
+            'Superregion east europe': land_provinces(in_superregions('eastern_europe_superregion') & ~in_regions('manchuria_region')),
+            'Superregion north america': land_provinces(in_superregions('north_america_superregion') | in_regions('rio_grande_region', 'california_region')),
+            'Superregion tartary': land_provinces(in_superregions('tartary_superregion') | in_regions('manchuria_region')),
+            'Region map': land_provinces(True),
             }
         for name, provinces in maps_to_generate.items():
             provinces = set(provinces)
@@ -123,26 +137,31 @@ class MapGenerator:
                 crop_to_color = True
             self.color_map_generator.generate_mapimage_with_several_colors(color_to_provinces, name, crop_to_color=crop_to_color)
 
+        # this needs the rendered image, so it has to wait until the batch is done
+        self.color_map_generator.defer(self.reorganize_oceania_map)
+
+    def reorganize_oceania_map(self):
         # reorganize the oceania image so that the parts west of the
         # date line are on the left side of the image and the parts
         # east of the date line are on the right of the image
         # provinces with a lower x value are considered to be
         # east of the date line
         x_threshold = 2000
-        provinces_east_of_date_line = set()
-        for line in self.mapparser.positions_to_provinceID_array:
-            provinces_east_of_date_line.update(line[:x_threshold])
+        stats = self.mapparser.province_stats
+        provinces_east_of_date_line = set(
+            np.flatnonzero((stats.count > 0) &
+                           (stats.min_x < x_threshold)).tolist())
         oceania_provinces_west_of_date_line = [prov.id for prov in self.mapparser.all_land_provinces.values() if prov.continent.name == 'oceania' and prov.id not in provinces_east_of_date_line]
         oceania_provinces_east_of_date_line = [prov.id for prov in self.mapparser.all_land_provinces.values() if prov.continent.name == 'oceania' and prov.id in provinces_east_of_date_line]
 
-        c_west = np.isin(self.mapparser.positions_to_provinceID_array, oceania_provinces_west_of_date_line).nonzero()
-        c_east = np.isin(self.mapparser.positions_to_provinceID_array, oceania_provinces_east_of_date_line).nonzero()
-        west_min_x = c_west[1].min() - 10
-        west_max_x = self.mapparser.positions_to_provinceID_array.shape[1] - 1
-        min_y = min(c_west[0].min(), c_east[0].min()) - 10
-        max_y = self.mapparser.positions_to_provinceID_array.shape[0] - 1
+        west_min_x, _, west_min_y, _ = stats.bounds(oceania_provinces_west_of_date_line)
+        _, east_max_x, east_min_y, _ = stats.bounds(oceania_provinces_east_of_date_line)
+        west_min_x -= 10
+        west_max_x = stats.shape[1] - 1
+        min_y = min(west_min_y, east_min_y) - 10
+        max_y = stats.shape[0] - 1
         east_min_x = 0
-        east_max_x = c_east[1].max() + 10
+        east_max_x += 10
 
         temp_image = Image.open(eu4outpath / 'Oceanian regions.png')
         oceania_west = temp_image.crop((west_min_x, min_y, west_max_x, max_y))
@@ -237,6 +256,9 @@ class MapGenerator:
             elif terrain.name not in ['lake', 'ocean']: # just use default colors for oceans and lakes because the game files make oceans white and have no color for lakes
                 color_to_provinces[terrain.color] = terrain.provinceIDs
         self.color_map_generator.generate_mapimage_with_several_colors(color_to_provinces, 'Terrain map', crop_to_color=False)
+        self.color_map_generator.defer(self.add_terrain_legend)
+
+    def add_terrain_legend(self):
         map_image = Image.open(eu4outpath / 'Terrain map.png')
         legend_image = Image.open(Path(__file__).parent / 'terrain_legend.png')
         map_image.paste(legend_image, (430, 820))
@@ -395,7 +417,7 @@ class MapGenerator:
                                         ]
 
     def print_provincelist_help_message(self):
-        print('Please specify a uncompressed save game as a second paramter on which the following run.txt was executed:')
+        print('Please specify a non-ironman save game (compressed or not) as a second paramter on which the following run.txt was executed:')
         print('-'*40)
         tags = []
         add_core_code = []
@@ -434,16 +456,14 @@ every_province = {
         print('\n'.join(add_core_code))
 
     def generate_provincelists(self, savefile):
-        save_data = open(savefile, encoding='cp1252').read()
-        core_regex = re.compile('^-([0-9]{1,4})=.*?(cores=\{\n([^}\n]*)|^\t\})', re.MULTILINE |re.DOTALL)
+        # the save is streamed and only the cores of the provinces are parsed. It can also be compressed
         tags_to_provinces = {}
-        for match in core_regex.finditer(save_data):
-            if match[3]:
-                provinceID = match[1]
-                for tag in match[3].split():
-                    if tag not in tags_to_provinces:
-                        tags_to_provinces[tag] = []
-                    tags_to_provinces[tag].append(provinceID)
+        for (_, province, _), cores in self.mapparser.parser.parse_save(savefile, ['provinces/*/cores']):
+            provinceID = province.lstrip('-')
+            for tag in cores:
+                if tag.val not in tags_to_provinces:
+                    tags_to_provinces[tag.val] = []
+                tags_to_provinces[tag.val].append(provinceID)
 
         print('Please add the following code to eu4/provincelists.py')
         print('-'*40)
@@ -458,22 +478,25 @@ every_province = {
             print('    "{}": [{}],'.format(terrain['terrain'], ','.join(tags_to_provinces[terrain['tag']])))
         print('}')
 
-    def generate_all(self):
-        self.superregion_map()
-        self.region_maps()
-        self.island_maps()
-        self.decision_maps()
-        self.coal_map()
-        self.gold_map()
-        self.achievement_maps()
-        self.culture_group_map()
-        self.religion_map()
-        self.trade_node_map()
-        self.trade_company_map()
-        self.terrain_map()
-        self.colonial_region_map()
-        self.country_map()
-        self.mission_map()
+    def generate_all(self, workers=None):
+        """generate all maps. They are rendered and saved in parallel by workers processes
+        (default: the number of cpus) after all of them have been set up"""
+        with self.color_map_generator.batch_rendering(workers):
+            self.superregion_map()
+            self.region_maps()
+            self.island_maps()
+            self.decision_maps()
+            self.coal_map()
+            self.gold_map()
+            self.achievement_maps()
+            self.culture_group_map()
+            self.religion_map()
+            self.trade_node_map()
+            self.trade_company_map()
+            self.terrain_map()
+            self.colonial_region_map()
+            self.country_map()
+            self.mission_map()
 
 
 if __name__ == '__main__':
@@ -486,7 +509,8 @@ if __name__ == '__main__':
             else:
                 generator.generate_provincelists(sys.argv[2])
         else:
-            for arg in sys.argv[1:]:
-                getattr(generator, arg)()
+            with generator.color_map_generator.batch_rendering():
+                for arg in sys.argv[1:]:
+                    getattr(generator, arg)()
     else:
         generator.generate_all()
@@ -0,0 +1,80 @@
+import numpy as np
+
+
+class GeographyIndex:
+    """columnar index of the area, region, superregion, continent, trade node and type of each province
+
+    for each level, names[level] is the list of its names and of_province[level] an int32 array
+    indexed by province id with the position of the province's name in that list or -1 if it
+    has none. the members of each name are the slices of a CSR-style array of province ids,
+    see members. has_port is a bool array indexed by province id.
+
+    queries over several levels are array operations on masks, e.g. the land provinces
+    with a port in a superregion are
+        geography.where(superregion='india_superregion', type='Land', has_port=True)
+    """
+    levels = ('area', 'region', 'superregion', 'continent', 'tradenode', 'type')
+
+    def __init__(self, size):
+        self.size = size
+        self.names = {}
+        self.codes = {}
+        self.of_province = {}
+        self.member_offsets = {}
+        self.member_ids = {}
+        self.has_port = np.zeros(size, bool)
+
+    def add_level(self, level, names, of_province):
+        """add a level with the list of names and the array of their positions for each province id"""
+        of_province = np.asarray(of_province, np.int32)
+        self.names[level] = list(names)
+        self.codes[level] = {name: code for code, name in enumerate(names)}
+        self.of_province[level] = of_province
+        provinces = np.flatnonzero(of_province >= 0)
+        codes = of_province[provinces]
+        self.member_ids[level] = provinces[np.argsort(codes, kind='stable')].astype(np.int32)
+        self.member_offsets[level] = np.zeros(len(names) + 1, np.int64)
+        np.cumsum(np.bincount(codes, minlength=len(names)), out=self.member_offsets[level][1:])
+
+    def name(self, level, province):
+        """return the name at level of the province or '' if it has none"""
+        code = self.of_province[level][province]
+        return self.names[level][code] if code >= 0 else ''
+
+    def members(self, level, name):
+        """return the ascending array of the ids of the provinces which belong to name"""
+        code = self.codes[level].get(name)
+        if code is None:
+            return np.zeros(0, np.int32)
+        offsets = self.member_offsets[level]
+        return self.member_ids[level][offsets[code]:offsets[code + 1]]
+
+    def mask(self, level, names):
+        """return a bool array indexed by province id, which is True for the members of names
+
+        names can be one name or a list of them
+        """
+        if isinstance(names, str):
+            names = [names]
+        codes = [self.codes[level][name] for name in names if name in self.codes[level]]
+        return np.isin(self.of_province[level], codes)
+
+    def where(self, has_port=None, **names):
+        """return the ascending array of the ids of the provinces which match all conditions
+
+        the keywords are levels with one name or a list of names and has_port
+        """
+        mask = np.ones(self.size, bool)
+        for level, level_names in names.items():
+            mask &= self.mask(level, level_names)
+        if has_port is not None:
+            mask &= self.has_port == has_port
+        return np.flatnonzero(mask)
+
+    def any_member(self, level, name, **names):
+        """return whether any member of name matches the conditions, e.g. type='Land'"""
+        members = self.members(level, name)
+        mask = np.ones(len(members), bool)
+        for other_level, other_names in names.items():
+            mask &= self.mask(other_level, other_names)[members]
+        return bool(mask.any())
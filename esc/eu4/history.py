@@ -0,0 +1,134 @@
+import bisect
+import os
+import pickle
+import re
+from ck2parser import Obj, Pair
+from eu4.cache import file_digest, source_digest
+from eu4.paths import eu4cachedir
+
+
+def plain_value(value):
+    """convert a value from the parse tree to python values
+
+    objects become tuples of their contents and pairs (key, value) tuples
+    """
+    if isinstance(value, Obj):
+        return tuple(plain_value(item) for item in value)
+    if isinstance(value, Pair):
+        return value.key.val, plain_value(value.value)
+    return value.val
+
+
+class ProvinceHistory:
+    """the compiled history file of a province
+
+    values and modifiers are set by the undated part of the file. entries has a
+    (values, modifiers) tuple for each date block in chronological order and dates
+    the (year, month, day) tuple of each entry. Blocks with the same date are applied
+    in the order in which they appear in the file
+    """
+    __slots__ = 'values', 'modifiers', 'dates', 'entries'
+
+    def __init__(self, values, modifiers, dated_entries):
+        self.values = values
+        self.modifiers = modifiers
+        dated_entries = sorted(dated_entries, key=lambda entry: entry[0])
+        self.dates = [date for date, _, _ in dated_entries]
+        self.entries = [(entry_values, entry_modifiers) for _, entry_values, entry_modifiers in dated_entries]
+
+    @classmethod
+    def from_tree(cls, tree):
+        values = {}
+        modifiers = []
+        dated_entries = []
+        for n, v in tree:
+            if isinstance(n.val, tuple):
+                entry_values = {}
+                entry_modifiers = []
+                for n2, v2 in v:
+                    cls._add_value(entry_values, entry_modifiers, n2, v2)
+                dated_entries.append((n.val, entry_values, entry_modifiers))
+            else:
+                cls._add_value(values, modifiers, n, v)
+        return cls(values, modifiers, dated_entries)
+
+    @staticmethod
+    def _add_value(values, modifiers, n, v):
+        if n.val == 'add_permanent_province_modifier':
+            modifiers.append(v['name'].val)
+        elif n.val == 'add_province_triggered_modifier':
+            modifiers.append(v.val)
+        else:
+            values[n.val] = plain_value(v)
+
+    def at(self, date):
+        """return (values, modifiers) after all entries up to and including date were applied"""
+        values = dict(self.values)
+        modifiers = list(self.modifiers)
+        for entry_values, entry_modifiers in self.entries[:bisect.bisect_right(self.dates, date)]:
+            values.update(entry_values)
+            modifiers.extend(entry_modifiers)
+        return values, modifiers
+
+
+def _cachefile():
+    if eu4cachedir:
+        return eu4cachedir / 'eu4.history' / 'province_histories.pkl'
+    return None
+
+
+def _load_compiled(cachefile, version):
+    if cachefile and cachefile.exists():
+        try:
+            with cachefile.open('rb') as f:
+                cached_version, compiled = pickle.load(f)
+            if cached_version == version:
+                return compiled
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            pass
+    return {}
+
+
+def _save_compiled(cachefile, version, compiled):
+    cachefile.parent.mkdir(parents=True, exist_ok=True)
+    temp_file = cachefile.with_name(cachefile.name + '.tmp')
+    with temp_file.open('wb') as f:
+        pickle.dump((version, compiled), f, pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_file, cachefile)
+
+
+def load_province_histories(parser, max_provinces):
+    """return a dict of provinceIDs to the ProvinceHistory of their history/provinces file
+
+    the compiled histories are kept in eu4cachedir together with the size, modification
+    time and a hash of their file. Only files whose content changed since the last call
+    are parsed and compiled again
+    """
+    cachefile = _cachefile()
+    version = source_digest(ProvinceHistory)
+    compiled = _load_compiled(cachefile, version)
+    changed = False
+    seen = {}
+    histories = {}
+    for path in parser.files('history/provinces/*'):
+        match = re.match(r'\d+', path.stem)
+        if not match:
+            continue
+        number = int(match.group())
+        if number >= max_provinces:
+            continue
+        stat = path.stat()
+        key = str(path)
+        entry = compiled.get(key)
+        if entry is None or (entry[0], entry[1]) != (stat.st_size, stat.st_mtime_ns):
+            digest = file_digest(path)
+            if entry is not None and entry[2] == digest:
+                entry = stat.st_size, stat.st_mtime_ns, digest, entry[3]
+            else:
+                entry = stat.st_size, stat.st_mtime_ns, digest, ProvinceHistory.from_tree(parser.parse_file(path))
+            changed = True
+        seen[key] = entry
+        histories[number] = entry[3]
+    if cachefile and (changed or len(seen) != len(compiled)):
+        _save_compiled(cachefile, version, seen)
+    return histories
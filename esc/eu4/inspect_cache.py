@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+import os
+import sys
+# add the parent folder to the path so that imports work even if the working directory is the eu4 folder
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from eu4.cache import cache_entries
+from eu4.paths import eu4cachedir
+
+
+def main():
+    """list the disk_cache entries with their size and the reasons why they would be computed again"""
+    if not eu4cachedir:
+        print('The disk cache is disabled')
+        return
+    print('Cache entries in {}'.format(eu4cachedir))
+    total_size = 0
+    stale = 0
+    for cachefile, size, reasons in cache_entries():
+        total_size += size
+        print('{:>10.1f} KiB  {}/{}  {}'.format(size / 1024, cachefile.parent.name, cachefile.name,
+                                               'stale' if reasons else 'up to date'))
+        if reasons:
+            stale += 1
+            for reason in reasons:
+                print(' ' * 17 + reason)
+    print('{:.1f} MiB in total, {} stale entries'.format(total_size / 1024 / 1024, stale))
+
+
+if __name__ == '__main__':
+    main()
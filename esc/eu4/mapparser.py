@@ -1,14 +1,17 @@
 from collections import OrderedDict
-import re
 import numpy as np
 from PIL import Image
 from ck2parser import csv_rows, Pair
 from localpaths import cachedir
-from eu4.provincelists import terrain_to_provinces
+from provincemap import edge_sets, ProvinceStats, MapAssets
+import eu4.provincelists
+from eu4.provincelists import terrain_to_provinces, coastal_provinces
 from eu4.eu4lib import Province, Continent, Area, Region, Superregion, \
     TradeCompany, Terrain, ColonialRegion, TradeNode, Eu4Color
 from eu4.parser import Eu4Parser
-from eu4.cache import disk_cache, cached_property, NumpySerializer
+from eu4.cache import disk_cache, cached_property, record_file
+from eu4.geography import GeographyIndex
+from eu4.history import load_province_histories
 
 
 class Eu4MapParser(Eu4Parser):
@@ -19,10 +22,14 @@ class Eu4MapParser(Eu4Parser):
     # override capitalization of supplies to match the wiki
     localizationOverrides = {'naval_supplies': 'Naval supplies'}
 
+    start_date = (1444, 11, 11)
+
     def __init__(self):
         super().__init__()
 
-        self.default_tree = self.parser.parse_file('map/default.map')
+        default_map = self.parser.file('map/default.map')
+        self.default_tree = self.parser.parse_file(default_map)
+        self.disk_cache_files.append(default_map)
         self.random_only = {n.val for n in self.default_tree['only_used_for_random']}
         self.max_provinces = self.default_tree['max_provinces'].val
         self.provinces_rgb_map = None
@@ -49,34 +56,43 @@ class Eu4MapParser(Eu4Parser):
         return self.provinces_rgb_map
 
     @cached_property
-    @disk_cache(NumpySerializer)
+    def _map_assets(self):
+        return MapAssets(cachedir / 'map_assets' if cachedir else None, self.map_path('provinces'),
+                         self.map_path('definitions'), self._get_provinces_rgb_map())
+
+    @property
+    def map_assets(self):
+        """the provincemap.MapAssets of provinces.bmp, which are shared with the other map tools"""
+        # they are stored outside of disk_cache, so disk_cache entries which use them have to know about the files
+        record_file(self._map_assets.provinces_path)
+        record_file(self._map_assets.definition_path)
+        return self._map_assets
+
+    @property
     def positions_to_provinceID_array(self):
-        """create a two-dimensional array which contains the province id for
+        """a two-dimensional array which contains the province id for
         each point of the provinces.bmp
         """
-        # the code is valid, because Image implements __array_interface__
+        return self.map_assets.ids
+
+    @cached_property
+    @disk_cache()
+    def province_stats(self):
+        """pixel count, bounds, centroid, most common terrain.bmp index and
+        pixel indices of each province, see provincemap.ProvinceStats
+        """
         # noinspection PyTypeChecker
-        pa = np.array(Image.open(str(self.map_path('provinces'))))
-        pa = pa.view('u1,u1,u1')[..., 0]
-        pa = np.vectorize(lambda x: self._get_provinces_rgb_map()[tuple(x)],
-                          otypes=[np.uint16])(pa)
-        return pa
+        terrain = np.array(Image.open(str(self.map_path('terrain'))))
+        return ProvinceStats(self.positions_to_provinceID_array, terrain)
 
     @cached_property
     @disk_cache()
     def all_provinceIDs(self):
         """all ids including water and wasteland, but not provinces in the RNW"""
-        province_positions = self.positions_to_provinceID_array
-        provinceIDs = []
-        for i in range(1, self.max_provinces):
-            if i in self.random_only:
-                continue
-            # check if province exists in the province map
-            prov_indices = np.nonzero(province_positions == i)
-            if not len(prov_indices[0]):
-                continue
-            provinceIDs.append(i)
-        return provinceIDs
+        # check if province exists in the province map
+        return [i for i in range(1, self.max_provinces)
+                if i not in self.random_only and
+                self.province_stats.has_pixels(i)]
 
     @cached_property
     def all_provinces(self):
@@ -124,18 +140,13 @@ class Eu4MapParser(Eu4Parser):
             if v['type'].val in inland_sea_names:
                 inland_sea_nums.update(n2.val for n2 in v['color'])
 
-        pa = self.positions_to_provinceID_array
-        # the code is valid, because Image implements __array_interface__
-        # noinspection PyTypeChecker
-        ta = np.array(Image.open(str(self.map_path('terrain'))))
-
+        stats = self.province_stats
         for number in self.all_provinceIDs:
             if number in is_inland_sea:
                 # skip provinces which were already set by a terrain override
                 continue
-            prov_indices = np.nonzero(pa == number)
-            if len(prov_indices[0]):
-                terrain_num = np.argmax(np.bincount(ta[prov_indices]))
+            if stats.has_pixels(number):
+                terrain_num = int(stats.terrain[number])
                 is_inland_sea[number] = terrain_num in inland_sea_nums
         return [provinceID
                 for provinceID, province_is_inland_sea in is_inland_sea.items()
@@ -372,6 +383,52 @@ class Eu4MapParser(Eu4Parser):
         else:
             return ''
 
+    @cached_property
+    @disk_cache()
+    def geography(self):
+        """GeographyIndex of the areas, regions, superregions, continents, trade nodes, types and ports of all provinces"""
+        # has_port comes from the generated provincelists
+        record_file(eu4.provincelists.__file__)
+        geography = GeographyIndex(self.max_provinces)
+
+        def codes_of(mapping, names, size):
+            """array of the positions in names of the values of mapping for the keys 0 to size - 1"""
+            codes = {name: code for code, name in enumerate(names)}
+            of = np.full(size, -1, np.int32)
+            for key, value in mapping.items():
+                if value in codes and 0 <= key < size:
+                    of[key] = codes[value]
+            return of
+
+        area_names = list(self.all_areas)
+        area_of = codes_of({provinceID: area.name for provinceID, area in self.province_to_area_mapping.items()},
+                           area_names, self.max_provinces)
+        geography.add_level('area', area_names, area_of)
+        # regions and superregions are looked up through the area and region like in Province
+        region_names = list(self.all_regions)
+        area_to_region = codes_of({code: self.get_region(name).name for code, name in enumerate(area_names)},
+                                  region_names, len(area_names))
+        region_of = np.where(area_of >= 0, area_to_region[area_of], -1)
+        geography.add_level('region', region_names, region_of)
+        superregion_names = list(self.all_superregions)
+        region_to_superregion = codes_of({code: self.get_superregion(name).name for code, name in enumerate(region_names)},
+                                         superregion_names, len(region_names))
+        geography.add_level('superregion', superregion_names, np.where(region_of >= 0, region_to_superregion[region_of], -1))
+        continent_names = list(self.all_continents)
+        geography.add_level('continent', continent_names, codes_of(
+            {provinceID: continent.name for provinceID, continent in self.province_to_continent_mapping.items()},
+            continent_names, self.max_provinces))
+        trade_node_names = list(self.all_trade_nodes)
+        geography.add_level('tradenode', trade_node_names, codes_of(
+            {provinceID: trade_node.name for provinceID, trade_node in self.province_to_trade_node_mapping.items()},
+            trade_node_names, self.max_provinces))
+        type_names = ['Land', 'Wasteland', 'Sea', 'Inland sea', 'Open sea', 'Lake']
+        geography.add_level('type', type_names, codes_of(self.province_to_province_type_mapping, type_names,
+                                                         self.max_provinces))
+        ports = [provinceID for provinceID in coastal_provinces if 0 <= provinceID < self.max_provinces]
+        geography.has_port[ports] = True
+        return geography
+
     @cached_property
     def all_trade_companies(self):
         all_tc = {}
@@ -428,7 +485,11 @@ class Eu4MapParser(Eu4Parser):
         return estuaries
 
     @cached_property
-    @disk_cache()
+    def province_histories(self):
+        """dict of provinceIDs to the eu4.history.ProvinceHistory of their history file"""
+        return load_province_histories(self.parser, self.max_provinces)
+
+    @cached_property
     def _province_attributes(self):
         """return a dictionary of province data
 
@@ -438,41 +499,18 @@ class Eu4MapParser(Eu4Parser):
         this method is used to set up the Province objects in all_provinces
         and it should not be called directly
         """
-        provinces_data = {}
-        for path in self.parser.files('history/provinces/*'):
-            match = re.match(r'\d+', path.stem)
-            if not match:
-                continue
-            number = int(match.group())
-            if number >= self.max_provinces:
-                continue
-            history = {}
-            values = {}
-            modifiers = []
-            for n, v in self.parser.parse_file(path):
-                if isinstance(n.val, tuple):
-                    if n.val <= (1444, 11, 11):
-                        history[n.val] = {}, []
-                        for n2, v2 in v:
-                            if n2.val == 'add_permanent_province_modifier':
-                                history[n.val][1].append(v2['name'].val)
-                            elif n2.val == 'add_province_triggered_modifier':
-                                history[n.val][1].append(v2.val)
-                            else:
-                                history[n.val][0][n2.val] = v2
-
-                elif n.val == 'add_permanent_province_modifier':
-                    modifiers.append(v['name'].val)
-                elif n.val == 'add_province_triggered_modifier':
-                    modifiers.append(v.val)
-                else:
-                    values[n.val] = v
+        return self.province_attributes_at(self.start_date)
 
-            for _, (history_values, history_modifiers) in sorted(history.items()):
-                values.update(history_values)
-                modifiers.extend(history_modifiers)
+    def province_attributes_at(self, date):
+        """return a dictionary of provinceIDs to province data at date
 
-            dev = [values[x].val if x in values else 0 for
+        date is a (year, month, day) tuple and the province data has the
+        same keys as the attributes of the Province objects in all_provinces
+        """
+        provinces_data = {}
+        for number, history in self.province_histories.items():
+            values, modifiers = history.at(date)
+            dev = [values[x] if x in values else 0 for
                    x in ['base_tax', 'base_production', 'base_manpower']]
             province = {}
             province['Development'] = int(sum(dev)) if sum(dev) else ''
@@ -480,31 +518,31 @@ class Eu4MapParser(Eu4Parser):
             province['BP'] = int(dev[1]) if dev[1] else ''
             province['BM'] = int(dev[2]) if dev[2] else ''
             if 'center_of_trade' in values:
-                province['center_of_trade'] = values['center_of_trade'].val
+                province['center_of_trade'] = values['center_of_trade']
             province['Modifiers'] = modifiers
             if 'owner' in values:
-                province['Owner'] = values['owner'].val
+                province['Owner'] = values['owner']
             if 'tribal_owner' in values:
-                province['tribal_owner'] = values['tribal_owner'].val
+                province['tribal_owner'] = values['tribal_owner']
 
             # sometimes uncolonized provinces have a trade good in the history file,
             # but that doesn't seem to have an impact on the game
             if 'trade_goods' in values and 'owner' in values:
-                province['Trade good'] = values['trade_goods'].val
+                province['Trade good'] = values['trade_goods']
             elif self.get_province_type(number) == 'Land':
                 province['Trade good'] = 'unknown'
             if 'religion' in values:
-                province['Religion'] = values['religion'].val
+                province['Religion'] = values['religion']
             if 'culture' in values:
-                culture = values['culture'].val
+                culture = values['culture']
                 province['Culture'] = culture
                 province['Culture Group'] = self.culture_to_culture_group_mapping[culture]
             if 'latent_trade_goods' in values:
                 if len(values['latent_trade_goods']) > 1:
                     raise Exception('Provinces with multiple latent trade goods are not handled')
                 else:
-                    for n in values['latent_trade_goods']:
-                        province['latent trade good'] = n.val
+                    for latent_trade_good in values['latent_trade_goods']:
+                        province['latent trade good'] = latent_trade_good
                         break
 
             provinces_data[number] = province
@@ -521,24 +559,8 @@ class Eu4MapParser(Eu4Parser):
     @disk_cache()
     def adjacency_map(self):
         """dictionary between provinceIDs and a set of adjacent provinceIDs"""
-        id_map = self.positions_to_provinceID_array
-        max_x = len(id_map[0])
-        max_y = len(id_map)
-        adjacency_map = {provinceID: set() for provinceID in self.all_provinceIDs}
-        for x in range(max_x):
-            for y in range(max_y):
-                provinceID = id_map[y][x]
-                if x > 0:
-                    adjacency_map[provinceID].add(id_map[y][x - 1])
-                if y > 0:
-                    adjacency_map[provinceID].add(id_map[y - 1][x])
-                if x < max_x - 1:
-                    adjacency_map[provinceID].add(id_map[y][x + 1])
-                if y < max_y - 1:
-                    adjacency_map[provinceID].add(id_map[y + 1][x])
-                # tests indicate that diagonal pixels don't count as adjacent
-                # examples:
-                # Halmaheran Sea(1400) - Flores Sea(1357)
-                # Stadacona (994) - Pekuakamiulnuatsh (2579)
-
-        return adjacency_map
+        # tests indicate that diagonal pixels don't count as adjacent
+        # examples:
+        # Halmaheran Sea(1400) - Flores Sea(1357)
+        # Stadacona (994) - Pekuakamiulnuatsh (2579)
+        return edge_sets(self.map_assets.edges, self.all_provinceIDs)
@@ -0,0 +1,118 @@
+import functools
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+from PIL import Image
+
+# the id array and border layer of the worker processes. They are memory-mapped, so all workers share one copy
+_worker_ids = None
+_worker_borders = None
+
+
+@functools.lru_cache(maxsize=16)
+def stripe_index(box, stripes, stripe_width=3):
+    """array of the stripe number (0 to stripes - 1) of each pixel in box for diagonal stripes
+
+    the stripes are aligned to the whole map, so that they don't depend on the crop box. box must
+    be a tuple. The result is cached per process and read-only
+    """
+    left, upper, right, lower = box
+    rows, cols = np.ogrid[upper:lower, left:right]
+    index = ((rows + cols) // stripe_width % stripes).astype(np.uint8)
+    index.flags.writeable = False
+    return index
+
+
+def render_map(ids, borders, lut, box, stripe_width=3):
+    """color the part box of the map with lut and paste the borders on top
+
+    ids is the province id array and borders the RGBA array of the border layer. box is
+    (left, upper, right, lower) as in pillow. lut maps province ids to colors. If it has three
+    dimensions, the first one is the stripe number and the provinces get diagonal stripes in
+    the colors of the different stripes
+    """
+    left, upper, right, lower = box
+    window = ids[upper:lower, left:right]
+    if lut.ndim == 3:
+        out_a = lut[stripe_index(tuple(box), len(lut), stripe_width), window]
+    else:
+        out_a = lut[window]
+    out = Image.fromarray(out_a)
+    borderlayer = Image.fromarray(np.ascontiguousarray(borders[upper:lower, left:right]), 'RGBA')
+    out.paste(borderlayer, mask=borderlayer)
+    return out
+
+
+def _set_render_arrays(ids, borders):
+    global _worker_ids, _worker_borders
+    _worker_ids = ids
+    _worker_borders = borders
+
+
+def _init_render_worker(ids_path, borders_path):
+    _set_render_arrays(np.load(ids_path, mmap_mode='r'), np.load(borders_path, mmap_mode='r'))
+
+
+def _render_job(job):
+    out_path, lut, box, stripe_width = job
+    start_time = time.perf_counter()
+    render_map(_worker_ids, _worker_borders, lut, box, stripe_width).save(str(out_path))
+    return out_path, time.perf_counter() - start_time
+
+
+class MapBatch:
+    """Collects map images and renders and saves them all at once in a process pool
+
+    Each job only consists of the color lookup table and the crop box, the id array and the
+    border layer are written once to .npy files which the workers memory-map. Functions which
+    need the finished images (e.g. to rearrange them) can be deferred until all jobs are done.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers if workers is not None else os.cpu_count()
+        self.jobs = []
+        self.deferred = []
+
+    def add(self, out_path, lut, box, stripe_width=3):
+        self.jobs.append((Path(out_path), lut, box, stripe_width))
+
+    def defer(self, f):
+        self.deferred.append(f)
+
+    def run(self, ids, borders):
+        """render all jobs, call the deferred functions and print the time which each map took"""
+        start_time = time.perf_counter()
+        if self.workers > 1 and len(self.jobs) > 1:
+            with tempfile.TemporaryDirectory() as shared_dir:
+                ids_path = os.path.join(shared_dir, 'ids.npy')
+                borders_path = os.path.join(shared_dir, 'borders.npy')
+                np.save(ids_path, ids)
+                np.save(borders_path, borders)
+                with multiprocessing.Pool(min(self.workers, len(self.jobs)), _init_render_worker,
+                                          (ids_path, borders_path)) as pool:
+                    timings = list(pool.imap_unordered(_render_job, self.jobs))
+        else:
+            _set_render_arrays(ids, borders)
+            try:
+                timings = [_render_job(job) for job in self.jobs]
+            finally:
+                _set_render_arrays(None, None)
+        wall_time = time.perf_counter() - start_time
+        self.jobs = []
+
+        for f in self.deferred:
+            f()
+        self.deferred = []
+
+        self.print_timings(timings, wall_time)
+        return timings
+
+    def print_timings(self, timings, wall_time, file=sys.stderr):
+        for out_path, seconds in sorted(timings, key=lambda timing: timing[1], reverse=True):
+            print('{:8.2f} s  {}'.format(seconds, out_path.name), file=file)
+        print('Rendered {} maps in {:.2f} s ({:.2f} s of rendering and encoding in up to {} processes)'.format(
+            len(timings), wall_time, sum(seconds for _, seconds in timings), self.workers), file=file)
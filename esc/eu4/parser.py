@@ -5,10 +5,33 @@ from collections import OrderedDict
 # add the parent folder to the path so that imports work even if the working directory is the eu4 folder
 sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
 from ck2parser import SimpleParser, Obj
+from localisation import LocalisationIndex, yml_entries
 from localpaths import eu4dir
-from eu4.paths import eu4_version
+from eu4.paths import eu4_version, eu4cachedir
 from eu4.eu4lib import Religion, Idea, IdeaGroup, Policy, Eu4Color, Country
-from eu4.cache import disk_cache, cached_property
+from eu4.cache import disk_cache, cached_property, record_file, record_glob
+
+
+class DependencyTrackingParser(SimpleParser):
+    """SimpleParser which tells disk_cache which files and globs are used to compute an entry"""
+
+    def files(self, glob, reverse=False):
+        record_glob(glob, self.basedir, self.moddirs)
+        for path in super().files(glob, reverse):
+            record_file(path)
+            yield path
+
+    def parse_files(self, glob, basedir=None, moddirs=None, *args, **kwargs):
+        record_glob(glob, self.basedir if basedir is None else basedir, self.moddirs if moddirs is None else moddirs)
+        for path, tree in super().parse_files(glob, basedir, moddirs, *args, **kwargs):
+            record_file(path)
+            yield path, tree
+
+    def parse_file(self, path, *args, **kwargs):
+        # strings are looked up with self.file, which records them
+        if not isinstance(path, str):
+            record_file(path)
+        return super().parse_file(path, *args, **kwargs)
 
 
 class Eu4Parser:
@@ -22,21 +45,17 @@ class Eu4Parser:
     localizationOverrides = {}
 
     def __init__(self):
-        self.parser = SimpleParser()
+        self.parser = DependencyTrackingParser()
         self.parser.basedir = eu4dir
+        # files which all disk_cache entries of this object depend on, e.g. because they were parsed in __init__
+        self.disk_cache_files = []
 
     @cached_property
     @disk_cache()
-    def _localisation_dict(self):
-        localisation_dict = {}
-        for path in (eu4dir / 'localisation').glob('*_l_english.yml'):
-            with path.open(encoding='utf-8-sig') as f:
-                for line in f:
-                    match = re.fullmatch(r'\s*([^#\s:]+):\d?\s*"(.*)"[^"]*', line)
-                    if match:
-                        localisation_dict[match.group(1)] = match.group(2)
-        localisation_dict.update(self.localizationOverrides)
-        return localisation_dict
+    def _localisation(self):
+        directory = eu4cachedir / 'localisation' if eu4cachedir else None
+        return LocalisationIndex(directory, self.parser.files('localisation/*_l_english.yml'), yml_entries,
+                                 later_wins=True)
 
     def localize(self, key: str, default: str = None) -> str:
         """localize the key from the english eu4 localisation files
@@ -47,7 +66,9 @@ class Eu4Parser:
         if default is None:
             default = key
 
-        return self._localisation_dict.get(key, default)
+        if key in self.localizationOverrides:
+            return self.localizationOverrides[key]
+        return self._localisation.get(key, default)
 
     @cached_property
     def eu4_version(self):
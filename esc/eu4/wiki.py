@@ -1,48 +1,101 @@
-from tempfile import TemporaryDirectory, mkstemp
+from tempfile import TemporaryDirectory
+import hashlib
 import os
+import pickle
 import subprocess
 import re
+from eu4.paths import eu4cachedir
 
 
 class WikiTextConverter:
     """Uses pdxparse to convert game code to wikitext.
 
     pdxparse has to be in the path so that it can be called by this class.
+
+    The results are cached by a hash of the code and its scope, in eu4cachedir if it is set.
+    So only code which wasn't converted before has to go through pdxparse.
     """
 
+    # the pdxparse option for each of the parameters of to_wikitext
+    scope_options = {'country_scope': '-c', 'province_scope': '-s', 'modifiers': '-m'}
+
+    def __init__(self):
+        if eu4cachedir:
+            self.cachefile = eu4cachedir / 'eu4.wiki' / 'wikitext.pkl'
+        else:
+            self.cachefile = None
+        self._cache = None
+
+    @property
+    def cache(self):
+        """dict of snippet hashes to wikitext"""
+        if self._cache is None:
+            self._cache = {}
+            if self.cachefile and self.cachefile.exists():
+                with self.cachefile.open('rb') as f:
+                    self._cache = pickle.load(f)
+        return self._cache
+
+    def save_cache(self):
+        if self.cachefile:
+            self.cachefile.parent.mkdir(parents=True, exist_ok=True)
+            temp_file = self.cachefile.with_name(self.cachefile.name + '.tmp')
+            with temp_file.open('wb') as f:
+                pickle.dump(self.cache, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_file, self.cachefile)
+
     def to_wikitext(self, country_scope=None, province_scope=None, modifiers=None):
         """calls pdxparse to convert the values of the parameter dicts from strings in pdxscript to wikitext. the dicts are modified in place
 
-            most of the slowness of this function is the overhead from calling pdxparse
-            and letting it parse the normal game files, so it is best to only call it once
-            with everything which needs to be converted
+            most of the slowness of pdxparse is the overhead of letting it parse the normal
+            game files, so all code which isn't in the cache yet is converted with a single
+            call. Identical code is only converted once
         """
+        snippets = {}
+        hashes = {}
+        for scope, dictionary in (('country_scope', country_scope), ('province_scope', province_scope),
+                                  ('modifiers', modifiers)):
+            if dictionary:
+                for key, value in dictionary.items():
+                    code = self.remove_surrounding_brackets(value)
+                    snippet_hash = self.snippet_hash(scope, code)
+                    hashes[scope, key] = snippet_hash
+                    if snippet_hash not in self.cache:
+                        snippets[snippet_hash] = scope, code
+
+        if snippets:
+            self.cache.update(self._run_pdxparse(snippets))
+            self.save_cache()
+
+        for scope, dictionary in (('country_scope', country_scope), ('province_scope', province_scope),
+                                  ('modifiers', modifiers)):
+            if dictionary:
+                for key in dictionary:
+                    dictionary[key] = self.cache[hashes[scope, key]]
+
+    def snippet_hash(self, scope, code):
+        return hashlib.blake2b('{}\0{}'.format(scope, code).encode(), digest_size=16).hexdigest()
+
+    def _run_pdxparse(self, snippets):
+        """convert the (scope, code) values of the dict snippets in one call of pdxparse and return a dict with the wikitext"""
         with TemporaryDirectory() as tmpfolder:
             inputfolder = tmpfolder + '/in'
             os.mkdir(inputfolder)
             outputfolder = tmpfolder + '/output'
-            self._replace_values_by_filenames(inputfolder, country_scope)
-            self._replace_values_by_filenames(inputfolder, province_scope)
-            self._replace_values_by_filenames(inputfolder, modifiers)
             pdxparse_arguments = ['pdxparse', '-e']
-            if country_scope:
-                for file in country_scope.values():
-                    pdxparse_arguments.append('-c')
-                    pdxparse_arguments.append(file)
-            if province_scope:
-                for file in province_scope.values():
-                    pdxparse_arguments.append('-s')
-                    pdxparse_arguments.append(file)
-            if modifiers:
-                for file in modifiers.values():
-                    pdxparse_arguments.append('-m')
-                    pdxparse_arguments.append(file)
+            filenames = {}
+            for snippet_hash, (scope, code) in snippets.items():
+                filename = os.path.join(inputfolder, snippet_hash + '.txt')
+                with open(filename, 'w') as file:
+                    file.write(code)
+                filenames[snippet_hash] = filename
+                pdxparse_arguments.append(self.scope_options[scope])
+                pdxparse_arguments.append(filename)
 
             subprocess.run(pdxparse_arguments, check=True, cwd=tmpfolder)
 
-            self._replace_filenames_with_values(outputfolder, country_scope)
-            self._replace_filenames_with_values(outputfolder, province_scope)
-            self._replace_filenames_with_values(outputfolder, modifiers)
+            return {snippet_hash: self._readfile(outputfolder + filename + '/' + os.path.basename(filename))
+                    for snippet_hash, filename in filenames.items()}
 
     def add_indent(self, wikilist):
         return re.sub(r'^\*', '**', wikilist, flags=re.MULTILINE)
@@ -50,12 +103,6 @@ class WikiTextConverter:
     def remove_indent(self, wikilist):
         return re.sub(r'^\*[\s]*', '', wikilist, flags=re.MULTILINE)
 
-    def _create_temp_file(self, folder, contents):
-        fp, filename = mkstemp(suffix='.txt', dir=folder)
-        with os.fdopen(fp, mode='w') as file:
-            file.write(contents)
-        return filename
-
     def _readfile(self, filename):
         with open(filename) as file:
             return file.read()
@@ -70,14 +117,3 @@ class WikiTextConverter:
             return match.group(1)
         else:
             return string
-
-    def _replace_values_by_filenames(self, folder, dictionary):
-        if dictionary:
-            for key in dictionary:
-                value = self.remove_surrounding_brackets(dictionary[key])
-                dictionary[key] = self._create_temp_file(folder, value)
-
-    def _replace_filenames_with_values(self, folder, dictionary):
-        if dictionary:
-            for key in dictionary:
-                dictionary[key] = self._readfile(folder + dictionary[key] + '/' + os.path.basename(dictionary[key]))
@@ -5,6 +5,7 @@ from PIL import Image
 from .ck2parser import rootpath, csv_rows, SimpleParser
 from .localpaths import eu4dir
 from .print_time import print_time
+from .provincemap import rgb_to_ids, report_unknown_colors
 
 def map(where, name='', crop=True):
     if isinstance(where, str):
@@ -48,9 +49,8 @@ for row in csv_rows(map_path('definitions')):
         rgb = tuple(np.uint8(row[1:4]))
         rgb_number_map[rgb] = np.uint16(number)
 prov_rgb = np.array(Image.open(str(map_path('provinces'))))
-prov_rgb = prov_rgb.view('u1,u1,u1')[..., 0]
-prov_id = np.vectorize(lambda x: rgb_number_map[tuple(x)],
-                       otypes=[np.uint16])(prov_rgb)
+prov_id, unknown = rgb_to_ids(prov_rgb, rgb_number_map)
+report_unknown_colors(prov_rgb, unknown)
 borders_path = rootpath / 'eu4borderlayer.png'
 borders = Image.open(str(borders_path))
 prov_color_lut_base = np.full(max_provinces, colors['land'], '3u1')
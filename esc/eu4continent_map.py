@@ -8,6 +8,7 @@ import spectra
 from .ck2parser import rootpath, csv_rows, SimpleParser
 from .localpaths import eu4dir
 from .print_time import print_time
+from .provincemap import rgb_to_ids, report_unknown_colors
 
 CONTINENT_COLOR = {
     'europe': '#7fffff',
@@ -55,8 +56,8 @@ def main():
         for n2 in v:
             prov_color_lut[n2.val] = upscaled
     a = np.array(Image.open(str(map_path('provinces'))))
-    a = a.view('u1,u1,u1')[..., 0]
-    b = np.vectorize(lambda x: rgb_number_map[tuple(x)], otypes=[np.uint16])(a)
+    b, unknown = rgb_to_ids(a, rgb_number_map)
+    report_unknown_colors(a, unknown)
     mod = parser.moddirs[0].name.lower() + '_' if parser.moddirs else ''
     borders_path = rootpath / (mod + 'eu4borderlayer.png')
     borders = Image.open(str(borders_path))
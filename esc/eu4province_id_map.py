@@ -7,6 +7,7 @@ from PIL import Image, ImageFont, ImageDraw
 from .ck2parser import rootpath, csv_rows, SimpleParser
 from .localpaths import eu4dir
 from .print_time import print_time
+from .provincemap import rgb_to_ids, report_unknown_colors
 
 @print_time
 def main():
@@ -49,8 +50,9 @@ def main():
     uninhabited_provs = set(range(1, max_provinces)) - inhabited_provs
 
     image = Image.open(str(provinces_path))
-    a = np.array(image).view('u1,u1,u1')[..., 0]
-    b = np.vectorize(lambda x: rgb_number_map[tuple(x)], otypes=[np.uint16])(a)
+    a = np.array(image)
+    b, unknown = rgb_to_ids(a, rgb_number_map)
+    report_unknown_colors(a, unknown)
     font = ImageFont.truetype(str(rootpath / 'ck2utils/esc/NANOTYPE.ttf'), 16)
     mod = parser.moddirs[0].name.lower() + '_' if parser.moddirs else ''
     borders_path = rootpath / (mod + 'eu4borderlayer.png')
@@ -10,6 +10,7 @@ import spectra
 from .ck2parser import rootpath, csv_rows, SimpleParser, Obj
 from .localpaths import eu4dir
 from .print_time import print_time
+from .provincemap import rgb_to_ids, report_unknown_colors
 
 TECH_GROUP_COLOR = {
     'western': '#ccc000',           'eastern': '#b38000',
@@ -92,8 +93,9 @@ def main():
         prov_color_lut[int(n.val)] = colors['sea']
 
     image = Image.open(str(provinces_path))
-    a = np.array(image).view('u1,u1,u1')[..., 0]
-    b = np.vectorize(lambda x: rgb_number_map[tuple(x)], otypes=[np.uint16])(a)
+    a = np.array(image)
+    b, unknown = rgb_to_ids(a, rgb_number_map)
+    report_unknown_colors(a, unknown)
     mod = parser.moddirs[0].name.lower() + '_' if parser.moddirs else ''
     borders_path = rootpath / (mod + 'eu4borderlayer.png')
     borders = Image.open(str(borders_path))
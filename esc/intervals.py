@@ -0,0 +1,181 @@
+# half-open intervals of many entities as sorted numpy columns, for checks
+# which would otherwise build an interval tree per title or character.
+# nothing here is imported relatively.
+
+import numpy as np
+
+# positions are integers in [BEGINNING, END], e.g. dates encoded as ints
+BEGINNING = 0
+END = (1 << 32) - 1
+
+def _keys(entity, position):
+    return (np.asarray(entity, np.int64) << 32) | np.asarray(position,
+                                                             np.int64)
+
+def _expand(lo, hi):
+    """return (row, k) for every k in range(lo[row], hi[row]) of every row"""
+    counts = np.maximum(hi - lo, 0)
+    rows = np.repeat(np.arange(len(lo)), counts)
+    starts = np.cumsum(counts) - counts
+    k = np.arange(counts.sum()) - np.repeat(starts, counts) + lo[rows]
+    return rows, k
+
+
+class Intervals:
+    """intervals [begin, end) of entities, each with a value
+
+    entity and value are non-negative integer codes and begin and end lie
+    in [BEGINNING, END]. the rows are sorted by entity, then begin, then
+    end. several methods need the intervals of each entity to be disjoint,
+    as the history of a title is; merge makes them so.
+    """
+
+    def __init__(self, entity=(), begin=(), end=(), value=None):
+        entity = np.asarray(entity, np.int64)
+        begin = np.asarray(begin, np.int64)
+        end = np.asarray(end, np.int64)
+        if value is None:
+            value = np.zeros(len(entity), np.int64)
+        value = np.asarray(value, np.int64)
+        keep = begin < end
+        order = np.lexsort((end[keep], begin[keep], entity[keep]))
+        self.entity = entity[keep][order]
+        self.begin = begin[keep][order]
+        self.end = end[keep][order]
+        self.value = value[keep][order]
+
+    @classmethod
+    def from_rows(cls, rows):
+        """return the Intervals of a list of (entity, begin, end, value)"""
+        if not rows:
+            return cls()
+        return cls(*np.array(rows, np.int64).T)
+
+    @classmethod
+    def concatenate(cls, parts):
+        """return the Intervals with the rows of all of parts"""
+        parts = list(parts)
+        return cls(*(np.concatenate([getattr(x, name) for x in parts])
+                     for name in ('entity', 'begin', 'end', 'value')))
+
+    def __len__(self):
+        return len(self.entity)
+
+    def __iter__(self):
+        """iterate over (entity, begin, end, value) rows"""
+        return zip(self.entity.tolist(), self.begin.tolist(),
+                   self.end.tolist(), self.value.tolist())
+
+    def select(self, mask):
+        """return the rows where mask is True"""
+        return Intervals(self.entity[mask], self.begin[mask], self.end[mask],
+                         self.value[mask])
+
+    def entities(self):
+        """return the entities which have any rows, ascending"""
+        return np.unique(self.entity)
+
+    def _overlap_ranges(self, key, begin, end):
+        # with disjoint intervals per entity, the ends are sorted too
+        lo = np.searchsorted(_keys(self.entity, self.end), _keys(key, begin),
+                             'right')
+        hi = np.searchsorted(_keys(self.entity, self.begin), _keys(key, end))
+        return lo, np.maximum(hi, lo)
+
+    def join(self, key, begin, end):
+        """find the rows which overlap each query interval [begin, end) of
+        entity key, given as arrays
+
+        return (query, row, begin, end): the index of the query and of the
+        row for every overlapping pair, and their intersection. the
+        intervals of each entity have to be disjoint.
+        """
+        begin = np.asarray(begin, np.int64)
+        end = np.asarray(end, np.int64)
+        lo, hi = self._overlap_ranges(key, begin, end)
+        query, row = _expand(lo, hi)
+        return (query, row, np.maximum(begin[query], self.begin[row]),
+                np.minimum(end[query], self.end[row]))
+
+    def subtract(self, other, key=None):
+        """return these intervals with the intervals of other removed
+
+        each row loses the parts covered by the rows of other of entity key,
+        which defaults to its own entity; key can be an array with one entity
+        of other per row, e.g. zeros to remove the same intervals from every
+        entity. rows are split like by chopping an interval tree, so rows
+        which were adjacent stay separate. the intervals of each entity of
+        other have to be disjoint.
+        """
+        if not len(other):
+            return self
+        if key is None:
+            key = self.entity
+        key = np.broadcast_to(np.asarray(key, np.int64), self.entity.shape)
+        lo, hi = other._overlap_ranges(key, self.begin, self.end)
+        # the pieces of each row are the gaps between the rows of other
+        # overlapping it, and before the first and after the last
+        row, k = _expand(lo, hi + 1)
+        first = k == lo[row]
+        last = k == hi[row]
+        begin = np.where(first, self.begin[row],
+                         other.end[np.maximum(k - 1, 0)])
+        end = np.where(last, self.end[row],
+                       other.begin[np.minimum(k, len(other) - 1)])
+        begin = np.maximum(begin, self.begin[row])
+        end = np.minimum(end, self.end[row])
+        return Intervals(self.entity[row], begin, end, self.value[row])
+
+    def chop(self, begin, end):
+        """return these intervals with [begin, end) removed from each"""
+        return self.subtract(Intervals([0], [begin], [end]),
+                             np.zeros(len(self), np.int64))
+
+    def gaps(self, entities, begin=BEGINNING, end=END):
+        """return the parts of [begin, end) which no row of each of
+        entities covers, with value 0"""
+        entities = np.asarray(entities, np.int64)
+        whole = Intervals(entities, np.full(len(entities), begin),
+                          np.full(len(entities), end))
+        return whole.subtract(self.merge(by_value=False))
+
+    def merge(self, by_value=True):
+        """return the intervals with overlapping or adjacent rows of the
+        same entity, and with by_value of the same value, merged into one"""
+        if not len(self):
+            return self
+        if by_value:
+            order = np.lexsort((self.begin, self.value, self.entity))
+        else:
+            order = np.arange(len(self))
+        entity = self.entity[order]
+        begin = self.begin[order]
+        end = self.end[order]
+        value = self.value[order]
+        changed = np.zeros(len(order), bool)
+        changed[1:] = entity[1:] != entity[:-1]
+        if by_value:
+            changed[1:] |= value[1:] != value[:-1]
+        # offset each run of one entity and value, so that the running
+        # maximum of the ends restarts with it
+        offset = np.cumsum(changed) << 33
+        group_end = np.maximum.accumulate(offset + end)
+        new = changed.copy()
+        new[0] = True
+        new[1:] |= offset[1:] + begin[1:] > group_end[:-1]
+        starts = np.flatnonzero(new)
+        ends = np.maximum.reduceat(end, starts)
+        return Intervals(entity[starts], begin[starts], ends,
+                         value[starts] if by_value else None)
+
+    def split_overlaps(self):
+        """return (row, begin, end) with the pieces of every row between
+        consecutive begins and ends of all rows of its entity, like
+        IntervalTree.split_overlaps"""
+        bounds = np.unique(np.concatenate([_keys(self.entity, self.begin),
+                                           _keys(self.entity, self.end)]))
+        lo = np.searchsorted(bounds, _keys(self.entity, self.begin))
+        hi = np.searchsorted(bounds, _keys(self.entity, self.end))
+        row, k = _expand(lo, hi)
+        mask = (1 << 32) - 1
+        return row, bounds[k] & mask, bounds[k + 1] & mask
@@ -6,8 +6,8 @@ import pathlib
 import re
 import shutil
 import tempfile
-from .ck2parser import (rootpath, vanilladir, csv_rows, files, is_codename,
-                        get_cultures, get_localisation, SimpleParser)
+from .ck2parser import (rootpath, vanilladir, is_codename, get_cultures,
+                        localisation_index, SimpleParser)
 from .print_time import print_time
 
 modpath = rootpath / 'SWMH-BETA/SWMH'
@@ -18,21 +18,15 @@ def abbrev_path(path):
     return prefix + '/' + path.name
 
 def get_locs(where):
-    locs = collections.OrderedDict()
+    locs = localisation_index(where)
     dupe_lines = []
-    for path in files('localisation/*.csv', where):
-        vanilla = modpath not in path.parents
-        for row, linenum in csv_rows(path, linenum=True):
-            if row[0] in locs:
-                # don't care about overriding vanilla
-                if not vanilla:
-                    line = ('{0!r} localisation at {1[1]!r}:{1[2]} '
-                        'overrides {2!r}:{3}\n'.format(row[0],
-                        locs[row[0]], abbrev_path(path), linenum))
-                    dupe_lines.append(line)
-            else:
-                locs[row[0]] = row[1], abbrev_path(path), linenum
-    locs = collections.OrderedDict((k, v[0]) for k, v in locs.items())
+    for key, (path, linenum), (dupe_path, dupe_linenum) in locs.overrides():
+        # don't care about overriding vanilla
+        if modpath in dupe_path.parents:
+            line = ('{!r} localisation at {!r}:{} overrides {!r}:{}\n'.format(
+                key, abbrev_path(path), linenum, abbrev_path(dupe_path),
+                dupe_linenum))
+            dupe_lines.append(line)
     return locs, dupe_lines
 
 def scan_landed_titles(parser, cultures, loc_mod):
@@ -70,7 +64,7 @@ def main():
     # province_title.update(province_title_mod)
     cultures, cult_group = get_cultures(parser)
     mod_loc, dupe_lines = get_locs(parser.moddirs)
-    vanilla_loc = get_localisation()
+    vanilla_loc = localisation_index()
     # localisation = vanilla_loc.copy()
     # localisation.update(mod_loc)
     dynamics, undef = scan_landed_titles(parser, cultures, mod_loc)
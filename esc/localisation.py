@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+
+# a compiled index of the localisation of a game and mod stack. nothing here
+# is imported relatively, so both the scripts in this directory and the eu4
+# package can use it
+
+from bisect import bisect_left
+import collections.abc
+import hashlib
+import os
+import pickle
+import re
+import shutil
+import tempfile
+import numpy as np
+
+YML_LINE = re.compile(r'\s*([^#\s:]+):\d?\s*"(.*)"[^"]*')
+
+def yml_entries(path):
+    """yield (key, value, line number) of each entry of a .yml file"""
+    with open(str(path), encoding='utf-8-sig') as f:
+        for linenum, line in enumerate(f, 1):
+            match = YML_LINE.fullmatch(line)
+            if match:
+                yield match.group(1), match.group(2), linenum
+
+def _file_stamp(path):
+    stat = os.stat(str(path))
+    return stat.st_size, stat.st_mtime_ns
+
+def _dump(obj, directory, path):
+    directory.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=str(directory))
+    with os.fdopen(fd, 'wb') as f:
+        pickle.dump(obj, f, pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, str(path))
+
+def _blob(strings):
+    """return (bytes, offsets) of strings, each terminated by a NUL"""
+    encoded = [s.encode() for s in strings]
+    offsets = np.zeros(len(encoded) + 1, np.int64)
+    np.cumsum([len(b) + 1 for b in encoded], out=offsets[1:])
+    blob = np.frombuffer(b''.join(b + b'\0' for b in encoded), np.uint8)
+    return blob, offsets
+
+
+class _BlobStrings(collections.abc.Sequence):
+    """the encoded strings of a blob, for bisection without decoding all"""
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        start, end = self.offsets[i:i + 2].tolist()
+        return self.blob[start:end - 1].tobytes()
+
+
+class LocalisationIndex(collections.abc.Mapping):
+    """the localisation of a stack of files as a read-only mapping of keys
+    to strings
+
+    the entries of paths are read by read(path), which yields (key, value,
+    line number). by default the first entry of a key wins, like in ck2;
+    with later_wins the last one does, like in the .yml games. the winning
+    keys are kept sorted in one blob and their strings in another, with the
+    file and line of each, and the entries they shadowed are kept for
+    overrides().
+
+    the arrays are stored as .npy files in a subdirectory of directory
+    named after the folders of the paths and the paths with their sizes and
+    modification times, and opened memory-mapped, so a lookup only reads the
+    keys it bisects and the string it returns. storing an index removes the
+    older ones of the same folders. the entries of each file are cached
+    too, so a changed file is the only one which is read again. with
+    directory None, nothing is stored. a pickled index keeps only its paths
+    and opens its arrays again when it is used.
+    """
+    version = 1
+    array_names = ('keys', 'key_offsets', 'values', 'value_offsets',
+                   'sources', 'lines', 'shadowed', 'shadowed_sources',
+                   'shadowed_lines')
+
+    def __init__(self, directory, paths, read, later_wins=False):
+        self.directory = directory
+        self.paths = list(paths)
+        self.read = read
+        self.later_wins = later_wins
+        self.arrays = {}
+        self._keys = None
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['arrays'] = {}
+        state['_keys'] = None
+        return state
+
+    def _stack_name(self):
+        """return the name of the folders of paths, which stays the same
+        when their files are changed, added or removed"""
+        key = hashlib.blake2b(digest_size=16)
+        key.update('{}\0{}.{}\0{}\0'.format(
+            self.version, self.read.__module__, self.read.__qualname__,
+            self.later_wins).encode())
+        folders = dict.fromkeys(os.path.dirname(str(path))
+                                for path in self.paths)
+        for folder in folders:
+            key.update('{}\0'.format(folder).encode())
+        return key.hexdigest()
+
+    def _stack_path(self):
+        key = hashlib.blake2b(digest_size=16)
+        for path in self.paths:
+            key.update('{}\0{}\0{}\0'.format(path, *_file_stamp(path))
+                       .encode())
+        return self.directory / '{}-{}'.format(self._stack_name(),
+                                                key.hexdigest())
+
+    def _remove_superseded(self, path):
+        """remove the stored indexes of the same folders other than path"""
+        for old_path in self.directory.glob(self._stack_name() + '-*'):
+            if old_path != path:
+                shutil.rmtree(str(old_path), ignore_errors=True)
+
+    def _file_entries(self, path):
+        """return the list of entries of path, read again if it changed"""
+        if self.directory is None:
+            return list(self.read(path))
+        files_dir = self.directory / 'files'
+        name = hashlib.blake2b('{}\0{}.{}'.format(
+            path, self.read.__module__, self.read.__qualname__).encode(),
+            digest_size=16).hexdigest()
+        cache_path = files_dir / (name + '.pkl')
+        stamp = _file_stamp(path)
+        try:
+            with open(str(cache_path), 'rb') as f:
+                cached_stamp, entries = pickle.load(f)
+            if cached_stamp == stamp:
+                return entries
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            pass
+        entries = list(self.read(path))
+        _dump((stamp, entries), files_dir, cache_path)
+        return entries
+
+    def compute(self):
+        """return a dict of the name of each array to the array"""
+        winners = {}
+        shadowed = []
+        for source, path in enumerate(self.paths):
+            for key, value, linenum in self._file_entries(path):
+                entry = value, source, linenum
+                if key not in winners:
+                    winners[key] = entry
+                    continue
+                if self.later_wins:
+                    winners[key], entry = entry, winners[key]
+                shadowed.append((key, entry[1], entry[2]))
+        keys = sorted(winners)
+        arrays = {}
+        arrays['keys'], arrays['key_offsets'] = _blob(keys)
+        arrays['values'], arrays['value_offsets'] = _blob(
+            winners[key][0] for key in keys)
+        arrays['sources'] = np.array([winners[key][1] for key in keys],
+                                     np.int32)
+        arrays['lines'] = np.array([winners[key][2] for key in keys],
+                                   np.int32)
+        # keys sort the same as their utf-8 encodings
+        positions = {key: i for i, key in enumerate(keys)}
+        arrays['shadowed'] = np.array([positions[key] for key, _, _
+                                       in shadowed], np.int64)
+        arrays['shadowed_sources'] = np.array([source for _, source, _
+                                               in shadowed], np.int32)
+        arrays['shadowed_lines'] = np.array([linenum for _, _, linenum
+                                             in shadowed], np.int32)
+        return arrays
+
+    def _store(self, path):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        temp_dir = tempfile.mkdtemp(dir=str(self.directory))
+        for name, array in self.compute().items():
+            np.save(os.path.join(temp_dir, name + '.npy'), array)
+        try:
+            os.rename(temp_dir, str(path))
+        except OSError:
+            # another process stored the same index first
+            shutil.rmtree(temp_dir)
+        self._remove_superseded(path)
+
+    def array(self, name):
+        """return the array name, memory-mapped read-only if it is stored"""
+        if not self.arrays:
+            if self.directory is None:
+                self.arrays.update(self.compute())
+            else:
+                path = self._stack_path()
+                if not path.exists():
+                    self._store(path)
+                for array_name in self.array_names:
+                    self.arrays[array_name] = np.load(
+                        str(path / (array_name + '.npy')), mmap_mode='r')
+        return self.arrays[name]
+
+    @property
+    def _sorted_keys(self):
+        if self._keys is None:
+            self._keys = _BlobStrings(self.array('keys'),
+                                      self.array('key_offsets'))
+        return self._keys
+
+    def find(self, key):
+        """return the position of key in the sorted keys, or -1"""
+        encoded = key.encode()
+        i = bisect_left(self._sorted_keys, encoded)
+        if i < len(self._sorted_keys) and self._sorted_keys[i] == encoded:
+            return i
+        return -1
+
+    def key_at(self, i):
+        return self._sorted_keys[i].decode()
+
+    def value_at(self, i):
+        start, end = self.array('value_offsets')[i:i + 2].tolist()
+        return self.array('values')[start:end - 1].tobytes().decode()
+
+    def source_at(self, i):
+        """return the (path, line number) of the entry at position i"""
+        return (self.paths[int(self.array('sources')[i])],
+                int(self.array('lines')[i]))
+
+    def __getitem__(self, key):
+        i = self.find(key)
+        if i < 0:
+            raise KeyError(key)
+        return self.value_at(i)
+
+    def __contains__(self, key):
+        return self.find(key) >= 0
+
+    def __len__(self):
+        return len(self._sorted_keys)
+
+    def __iter__(self):
+        """iterate over the keys in sorted order"""
+        for i in range(len(self)):
+            yield self.key_at(i)
+
+    def source(self, key):
+        """return the (path, line number) of the entry of key which wins"""
+        i = self.find(key)
+        if i < 0:
+            raise KeyError(key)
+        return self.source_at(i)
+
+    def overrides(self):
+        """yield (key, (path, line number) of the winning entry, (path, line
+        number) of the shadowed entry) for every shadowed entry, in the
+        order they were read"""
+        for i, source, linenum in zip(
+                self.array('shadowed').tolist(),
+                self.array('shadowed_sources').tolist(),
+                self.array('shadowed_lines').tolist()):
+            yield self.key_at(i), self.source_at(i), (self.paths[source],
+                                                      linenum)
+
+    def with_prefix(self, prefix):
+        """iterate over the keys which start with prefix, in sorted order"""
+        encoded = prefix.encode()
+        for i in range(bisect_left(self._sorted_keys, encoded), len(self)):
+            key = self._sorted_keys[i]
+            if not key.startswith(encoded):
+                break
+            yield key.decode()
+
+    def matching(self, pattern, prefix=''):
+        """iterate over the keys starting with prefix in which the regex
+        pattern matches somewhere, without reading their strings"""
+        search = re.compile(pattern).search
+        return (key for key in self.with_prefix(prefix) if search(key))
+
+    def to_dict(self):
+        """return a dict of every key to its string"""
+        keys = self.array('keys').tobytes().decode().split('\0')[:-1]
+        values = self.array('values').tobytes().decode().split('\0')[:-1]
+        return dict(zip(keys, values))
@@ -4,8 +4,9 @@ from pathlib import Path
 import sys
 import numpy as np
 from PIL import Image, ImageFont, ImageDraw
-from .ck2parser import rootpath, csv_rows, SimpleParser
+from .ck2parser import rootpath, cachedir, csv_rows, SimpleParser
 from .print_time import print_time
+from .provincemap import MapAssets
 
 @print_time
 def main():
@@ -24,21 +25,18 @@ def main():
         'desert': np.uint8((36, 36, 36)),
         'impassable_land': np.uint8((0, 0, 0)),
     }
-    rgb_number_map = {
-        tuple(np.uint8((0, 0, 0))): np.uint16(0),
-        tuple(np.uint8((255, 255, 255))): np.uint16(max_provinces)
-    }
+    rgb_number_map = {(0, 0, 0): 0, (255, 255, 255): max_provinces}
     prov_color_lut = np.full(max_provinces + 1, colors['desert'], '3u1')
     prov_color_lut[0] = colors['impassable_land']
     prov_color_lut[max_provinces] = colors['impassable_sea']
-    for row in csv_rows(parser.file('map/' + default_tree['definitions'].val)):
+    definition_path = parser.file('map/' + default_tree['definitions'].val)
+    for row in csv_rows(definition_path):
         try:
             number = int(row[0])
         except ValueError:
             continue
         if number < max_provinces:
-            rgb = tuple(np.uint8(row[1:4]))
-            rgb_number_map[rgb] = np.uint16(number)
+            rgb_number_map[tuple(int(x) for x in row[1:4])] = number
             path = 'history/provinces/{} - {}.txt'.format(number, row[4])
             try:
                 if 'title' in parser.parse_file(path).dictionary:
@@ -55,17 +53,18 @@ def main():
             prov_color_lut[[n2.val for n2 in v]] = colors['major_rivers']
     uninhabited_provs = set(range(1, max_provinces)) - inhabited_provs
 
-    image = Image.open(str(provinces_path))
-    a = np.array(image).view(dtype='u1,u1,u1')[..., 0]
-    b = np.vectorize(lambda x: rgb_number_map[tuple(x)], otypes=[np.uint16])(a)
+    assets = MapAssets(cachedir / 'map_assets', provinces_path,
+                       definition_path, rgb_number_map)
+    b = assets.ids
+    stats = assets.stats
+    height, width = b.shape
     font = ImageFont.truetype(str(rootpath / 'ck2utils/esc/NANOTYPE.ttf'), 16)
     mod = parser.moddirs[0].name.lower() + '_' if parser.moddirs else ''
-    borders_path = rootpath / (mod + 'borderlayer.png')
-    borders = Image.open(str(borders_path))
+    borders = assets.border_image()
 
     for provs, mode in [(inhabited_provs, ''), (uninhabited_provs, '_water')]:
-        txt = Image.new('RGBA', image.size, (0, 0, 0, 0))
-        lines = Image.new('RGBA', image.size, (0, 0, 0, 0))
+        txt = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+        lines = Image.new('RGBA', (width, height), (0, 0, 0, 0))
         draw_txt = ImageDraw.Draw(txt)
         draw_lines = ImageDraw.Draw(lines)
         maxlen = len(str(max(provs)))
@@ -74,20 +73,20 @@ def main():
         for number in sorted(provs):
             print('\r' + str(number), end='', file=sys.stderr)
             size = len(str(number)) * 4 - 1, 5
-            c = np.nonzero(b == number)
-            if len(c[0]) == 0:
+            if not stats.has_pixels(number):
                 continue
+            c = stats.coords(number)
             center = np.mean(c[1]), np.mean(c[0])
             pos = [int(round(max(0, min(center[0] - size[0] / 2,
-                                        image.width - size[0])))),
+                                        width - size[0])))),
                    int(round(max(0, min(center[1] - size[1] / 2,
-                                        image.height - size[1]))))]
+                                        height - size[1]))))]
             pos[2:] = pos[0] + size[0], pos[1] + size[1]
             if not e[size][pos[1], pos[0]]:
-                x1, x2 = max(0, pos[0] - 1), min(pos[0] + 2, image.width)
-                y1, y2 = max(0, pos[1] - 1), min(pos[1] + 2, image.height)
+                x1, x2 = max(0, pos[0] - 1), min(pos[0] + 2, width)
+                y1, y2 = max(0, pos[1] - 1), min(pos[1] + 2, height)
                 if not np.any(e[size][y1:y2, x1:x2]):
-                    x1, y1, (x2, y2) = 0, 0, image.size
+                    x1, y1, (x2, y2) = 0, 0, (width, height)
                 f = np.nonzero(e[size][y1:y2, x1:x2])
                 g = (f[0] - pos[1]) ** 2 + (f[1] - pos[0]) ** 2
                 pos[:2] = np.transpose(f)[np.argmin(g)][::-1] + [x1, y1]
@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+
+# numpy helpers for province maps. nothing here is imported relatively, so
+# both the scripts in this directory and the eu4 package can use them
+
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+import numpy as np
+
+# a lookup table over every 24-bit colour costs about as much as a sort of
+# this many pixels, so smaller inputs use searchsorted instead
+DENSE_LUT_MIN_PIXELS = 1 << 16
+
+def pack_rgb(rgb):
+    """return 0xRRGGBB for each colour of an (..., 3) array as uint32"""
+    rgb = np.asarray(rgb)
+    return ((rgb[..., 0].astype(np.uint32) << 16) |
+            (rgb[..., 1].astype(np.uint32) << 8) |
+            rgb[..., 2].astype(np.uint32))
+
+def unpack_rgb(keys):
+    """return the (..., 3) uint8 colours of an array of 0xRRGGBB integers"""
+    keys = np.asarray(keys, np.uint32)
+    return np.stack([keys >> 16, keys >> 8, keys], -1).astype(np.uint8)
+
+def rgb_to_ids(image, rgb_ids, dtype=np.uint16, unknown=0):
+    """return (ids, unknown_mask) for an (h, w, 3) array of pixel colours
+
+    rgb_ids maps (r, g, b) tuples to province ids. pixels of any other colour
+    get the id unknown, and are the True entries of unknown_mask.
+    """
+    keys = pack_rgb(image[..., :3])
+    colors = pack_rgb(np.array(list(rgb_ids), np.uint8).reshape(-1, 3))
+    values = np.fromiter(rgb_ids.values(), dtype, len(rgb_ids))
+    if keys.size >= DENSE_LUT_MIN_PIXELS:
+        lut = np.full(1 << 24, unknown, dtype)
+        lut[colors] = values
+        known = np.zeros(1 << 24, bool)
+        known[colors] = True
+        return lut[keys], ~known[keys]
+    order = np.argsort(colors)
+    colors = colors[order]
+    values = values[order]
+    index = np.minimum(np.searchsorted(colors, keys), len(colors) - 1)
+    unknown_mask = colors[index] != keys
+    ids = values[index]
+    ids[unknown_mask] = unknown
+    return ids, unknown_mask
+
+def unknown_colors(image, unknown_mask):
+    """return the sorted (r, g, b) tuples of the pixels in unknown_mask"""
+    keys = np.unique(pack_rgb(image[..., :3][unknown_mask]))
+    return [tuple(int(x) for x in rgb) for rgb in unpack_rgb(keys)]
+
+def report_unknown_colors(image, unknown_mask, file=sys.stderr):
+    """print the colours of the pixels in unknown_mask, if there are any"""
+    if unknown_mask.any():
+        print('{} pixels of unknown colours: {}'.format(
+              np.count_nonzero(unknown_mask),
+              unknown_colors(image, unknown_mask)), file=file)
+
+def adjacencies(ids, counts=False, coords=False):
+    """return the distinct pairs of ids of 4-adjacent pixels
+
+    the result is an (n, 2) array of (a, b) with a < b, sorted. with counts,
+    also return the number of adjacent pixel pairs along each border. with
+    coords, also return for each border a (k, 4) array of its pixel pairs as
+    rows of (row of a, col of a, row of b, col of b). diagonal pixels don't
+    count as adjacent.
+    """
+    ids = np.asarray(ids)
+    rows, cols = np.nonzero(ids[:, :-1] != ids[:, 1:])
+    down_rows, down_cols = np.nonzero(ids[:-1] != ids[1:])
+    first = np.stack([np.concatenate([rows, down_rows]),
+                      np.concatenate([cols, down_cols])])
+    second = first + np.repeat([[0, 1], [1, 0]], [len(rows), len(down_rows)],
+                               axis=1)
+    first_ids = ids[first[0], first[1]].astype(np.int64)
+    second_ids = ids[second[0], second[1]].astype(np.int64)
+    swap = first_ids > second_ids
+    low = np.where(swap, second_ids, first_ids)
+    high = np.where(swap, first_ids, second_ids)
+    keys, index, inverse, key_counts = np.unique(
+        (low << 32) | high, return_index=True, return_inverse=True,
+        return_counts=True)
+    edges = np.stack([low[index], high[index]], axis=1)
+    result = [edges]
+    if counts:
+        result.append(key_counts)
+    if coords:
+        pixels = np.where(swap, np.concatenate([second, first]),
+                          np.concatenate([first, second])).T
+        order = np.argsort(inverse, kind='stable')
+        result.append(np.split(pixels[order], np.cumsum(key_counts)[:-1]))
+    return result[0] if len(result) == 1 else tuple(result)
+
+def adjacency_sets(ids, keys=()):
+    """return a dict of each id to the set of ids adjacent to it
+
+    every id in keys gets an entry, even if it borders nothing
+    """
+    return edge_sets(adjacencies(ids), keys)
+
+def edge_sets(edges, keys=()):
+    """return a dict of each id to the set of ids adjacent to it from an
+    (n, 2) array of edges, like adjacency_sets"""
+    result = {key: set() for key in keys}
+    for a, b in np.asarray(edges).tolist():
+        result.setdefault(a, set()).add(b)
+        result.setdefault(b, set()).add(a)
+    return result
+
+def adjacency_graph(ids, counts=False):
+    """return a networkx graph of the adjacencies of ids
+
+    with counts, each edge has the length of its border in pixel pairs as
+    its 'border' attribute
+    """
+    import networkx
+    graph = networkx.Graph()
+    if counts:
+        edges, border = adjacencies(ids, counts=True)
+        graph.add_edges_from((a, b, {'border': n}) for (a, b), n
+                             in zip(edges.tolist(), border.tolist()))
+    else:
+        graph.add_edges_from(adjacencies(ids).tolist())
+    return graph
+
+
+class ProvinceStats:
+    """per-province pixel statistics of an id array, built in one pass
+
+    count, min_x, max_x, min_y, max_y, centroid_x and centroid_y are arrays
+    indexed by id. bounds are inclusive and -1 (centroids nan) for ids
+    with no pixels. given the matching terrain.bmp index array, terrain is
+    the commonest terrain index of each id. the flat pixel indices of each
+    id are one slice of a single sorted array; see pixels.
+    """
+
+    def __init__(self, ids, terrain=None):
+        ids = np.asarray(ids)
+        self.shape = ids.shape
+        flat = ids.ravel()
+        size = int(flat.max()) + 1
+        self.count = np.bincount(flat, minlength=size)
+        # stable, so each id's pixels stay in row-major order
+        self.order = np.argsort(flat, kind='stable').astype(np.int32)
+        self.starts = np.zeros(size + 1, np.int64)
+        np.cumsum(self.count, out=self.starts[1:])
+        present = np.flatnonzero(self.count)
+        firsts = self.starts[present]
+        lasts = self.starts[present + 1] - 1
+        rows, cols = np.divmod(self.order, self.shape[1])
+        self.min_y = np.full(size, -1, np.int32)
+        self.max_y = np.full(size, -1, np.int32)
+        self.min_x = np.full(size, -1, np.int32)
+        self.max_x = np.full(size, -1, np.int32)
+        self.min_y[present] = rows[firsts]
+        self.max_y[present] = rows[lasts]
+        self.min_x[present] = np.minimum.reduceat(cols, firsts)
+        self.max_x[present] = np.maximum.reduceat(cols, firsts)
+        height, width = self.shape
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.centroid_x = np.bincount(
+                flat, np.tile(np.arange(width), height), size) / self.count
+            self.centroid_y = np.bincount(
+                flat, np.repeat(np.arange(height), width), size) / self.count
+        if terrain is None:
+            self.terrain = None
+        else:
+            terrain = np.asarray(terrain).ravel().astype(np.int64)
+            kinds = int(terrain.max()) + 1
+            pairs = np.bincount(flat.astype(np.int64) * kinds + terrain,
+                                minlength=size * kinds)
+            self.terrain = pairs.reshape(size, kinds).argmax(axis=1)
+            self.terrain[self.count == 0] = -1
+
+    # the arrays which describe a ProvinceStats without terrain
+    array_names = ('count', 'order', 'starts', 'min_x', 'max_x', 'min_y',
+                   'max_y', 'centroid_x', 'centroid_y')
+
+    @classmethod
+    def from_arrays(cls, shape, arrays):
+        """return a ProvinceStats of an id array of the given shape from
+        the arrays in array_names, e.g. as stored by MapAssets"""
+        stats = cls.__new__(cls)
+        stats.shape = tuple(shape)
+        for name in cls.array_names:
+            setattr(stats, name, arrays[name])
+        stats.terrain = None
+        return stats
+
+    def ids(self):
+        """return the ids which have any pixels, ascending"""
+        return np.flatnonzero(self.count)
+
+    def has_pixels(self, province):
+        return 0 <= province < len(self.count) and self.count[province] > 0
+
+    def pixels(self, province):
+        """return the flat indices of the pixels of province, row-major"""
+        return self.order[self.starts[province]:self.starts[province + 1]]
+
+    def coords(self, province):
+        """return (rows, cols) of the pixels of province, like np.nonzero"""
+        return np.divmod(self.pixels(province), self.shape[1])
+
+    def bounds(self, provinces, margin=0):
+        """return (min_x, max_x, min_y, max_y) around all the given
+        provinces which have pixels, widened by margin within the map
+
+        raises ValueError if none of them have any pixels
+        """
+        provinces = [p for p in provinces if self.has_pixels(p)]
+        if not provinces:
+            raise ValueError('no pixels for the given provinces')
+        min_x = max(0, int(self.min_x[provinces].min()) - margin)
+        max_x = min(self.shape[1] - 1,
+                    int(self.max_x[provinces].max()) + margin)
+        min_y = max(0, int(self.min_y[provinces].min()) - margin)
+        max_y = min(self.shape[0] - 1,
+                    int(self.max_y[provinces].max()) + margin)
+        return min_x, max_x, min_y, max_y
+
+
+def definition_rgb_ids(path, max_id=None):
+    """return a dict of (r, g, b) to province id from a definition.csv
+
+    rows which don't start with four integers are skipped, as are ids of
+    max_id or more
+    """
+    rgb_ids = {}
+    with open(str(path), encoding='latin-1') as f:
+        for line in f:
+            try:
+                number, red, green, blue = map(int, line.split(';')[:4])
+            except ValueError:
+                continue
+            if max_id is None or number < max_id:
+                rgb_ids[red, green, blue] = number
+    return rgb_ids
+
+def _differs(cur, above):
+    """return where the values of a row tile differ from the value north,
+    west or northwest of them. above is the tile shifted one row down, with
+    the first row of the map as its own northern neighbour"""
+    diff = cur != above
+    diff[:, 1:] |= cur[:, 1:] != cur[:, :-1]
+    diff[:, 1:] |= cur[:, 1:] != above[:, :-1]
+    return diff
+
+def border_masks(ids, luts, blank=0, rows_per_tile=256):
+    """return a dict of bool border masks of a 2-d array of ids
+
+    ids can be province ids or colours packed by pack_rgb. each value of
+    luts is an array indexed by id which maps ids to groups, e.g. counties
+    or whether a province is water, and the mask of its key is True on the
+    pixels whose group differs from that of the pixel north, west or
+    northwest of them. a lut of None stands for the ids themselves, and its
+    mask is also True on the pixels whose id is blank.
+
+    all masks are made in one pass over tiles of rows_per_tile rows, so
+    memory use beyond the masks doesn't grow with the size of the map.
+    """
+    height, width = ids.shape
+    masks = {name: np.zeros((height, width), bool) for name in luts}
+    for start in range(0, height, rows_per_tile):
+        stop = min(start + rows_per_tile, height)
+        first = max(start - 1, 0)
+        tile = np.asarray(ids[first:stop])
+        cur = tile[start - first:]
+        above = tile[np.maximum(np.arange(start, stop) - 1, 0) - first]
+        for name, lut in luts.items():
+            if lut is None:
+                mask = _differs(cur, above)
+                mask |= cur == blank
+            else:
+                mask = _differs(lut[cur], lut[above])
+            masks[name][start:stop] = mask
+    return masks
+
+def border_mask(image):
+    """return a bool mask of the pixels of an (h, w, 3) colour array which
+    differ from the pixel north, west or northwest of them, or are black"""
+    return border_masks(pack_rgb(image), {'province': None})['province']
+
+def border_image(mask):
+    """return an RGBA PIL image which is opaque black where mask is True
+    and transparent elsewhere"""
+    from PIL import Image
+    rgba = np.zeros(mask.shape + (4,), np.uint8)
+    rgba[..., 3][mask] = 255
+    return Image.fromarray(rgba)
+
+
+class MapAssets:
+    """the arrays which map tools derive from a province map, computed once
+
+    ids is the uint16 province id of each pixel (see rgb_to_ids), borders
+    the border_mask of the image, edges and edge_counts the adjacencies of
+    ids with their border lengths and stats a ProvinceStats of ids without
+    terrain.
+
+    they are stored as .npy files in a subdirectory of directory named after
+    a hash of the provinces image, the definition csv and rgb_ids, so every
+    tool and game which uses the same map shares them. they are opened
+    memory-mapped when they are first used. the hashes of the files are
+    kept with their size and modification time, so the image is only read
+    again after it changed. with directory None, nothing is stored.
+    rgb_ids defaults to definition_rgb_ids(definition_path).
+    """
+    version = 1
+    array_names = (('ids', 'borders', 'edges', 'edge_counts') +
+                   ProvinceStats.array_names)
+
+    def __init__(self, directory, provinces_path, definition_path,
+                 rgb_ids=None):
+        self.directory = directory
+        self.provinces_path = provinces_path
+        self.definition_path = definition_path
+        if rgb_ids is None:
+            rgb_ids = definition_rgb_ids(definition_path)
+        self.rgb_ids = rgb_ids
+        self.arrays = {}
+        self._path = None
+        self._stats = None
+
+    @property
+    def path(self):
+        """the directory with the .npy files, built if it doesn't exist"""
+        if self._path is None:
+            key = hashlib.blake2b(digest_size=16)
+            key.update('{}\0'.format(self.version).encode())
+            for path in self.provinces_path, self.definition_path:
+                key.update(self._file_digest(path).encode())
+            key.update(repr(sorted((tuple(int(x) for x in rgb), int(number))
+                                   for rgb, number in self.rgb_ids.items()))
+                       .encode())
+            path = self.directory / key.hexdigest()
+            if not path.exists():
+                self._store(path)
+            self._path = path
+        return self._path
+
+    def _file_digest(self, path):
+        index_path = self.directory / 'file_digests.pkl'
+        try:
+            with open(str(index_path), 'rb') as f:
+                index = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            index = {}
+        stat = os.stat(str(path))
+        stamp = stat.st_size, stat.st_mtime_ns
+        if index.get(str(path), (None,))[:2] == stamp:
+            return index[str(path)][2]
+        digest = hashlib.blake2b(digest_size=16)
+        with open(str(path), 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        index[str(path)] = stamp + (digest.hexdigest(),)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=str(self.directory))
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(index, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, str(index_path))
+        return digest.hexdigest()
+
+    def compute(self):
+        """return a dict of the name of each array to the array"""
+        from PIL import Image
+        image = np.array(Image.open(str(self.provinces_path)).convert('RGB'))
+        ids, unknown = rgb_to_ids(image, self.rgb_ids)
+        report_unknown_colors(image, unknown)
+        arrays = {'ids': ids, 'borders': border_mask(image)}
+        arrays['edges'], arrays['edge_counts'] = adjacencies(ids, counts=True)
+        stats = ProvinceStats(ids)
+        for name in ProvinceStats.array_names:
+            arrays[name] = getattr(stats, name)
+        return arrays
+
+    def _store(self, path):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        temp_dir = tempfile.mkdtemp(dir=str(self.directory))
+        for name, array in self.compute().items():
+            np.save(os.path.join(temp_dir, name + '.npy'), array)
+        try:
+            os.rename(temp_dir, str(path))
+        except OSError:
+            # another process stored the same assets first
+            for name in os.listdir(temp_dir):
+                os.remove(os.path.join(temp_dir, name))
+            os.rmdir(temp_dir)
+
+    def array(self, name):
+        """return the array name, memory-mapped read-only if it is stored"""
+        if name not in self.arrays:
+            if self.directory is None:
+                self.arrays.update(self.compute())
+            else:
+                self.arrays[name] = np.load(
+                    str(self.path / (name + '.npy')), mmap_mode='r')
+        return self.arrays[name]
+
+    @property
+    def ids(self):
+        return self.array('ids')
+
+    @property
+    def borders(self):
+        return self.array('borders')
+
+    @property
+    def edges(self):
+        return self.array('edges')
+
+    @property
+    def edge_counts(self):
+        return self.array('edge_counts')
+
+    @property
+    def stats(self):
+        if self._stats is None:
+            self._stats = ProvinceStats.from_arrays(
+                self.ids.shape,
+                {name: self.array(name) for name in ProvinceStats.array_names})
+        return self._stats
+
+    def border_image(self):
+        """return the border_image of borders"""
+        return border_image(self.borders)
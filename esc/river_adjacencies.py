@@ -10,6 +10,7 @@ import numpy as np
 from PIL import Image
 from .ck2parser import rootpath, csv_rows, SimpleParser
 from .print_time import print_time
+from .provincemap import rgb_to_ids, report_unknown_colors, adjacencies
 
 
 @print_time
@@ -43,20 +44,23 @@ def main():
     province_graph = nx.Graph()
     provinces_path = parser.file('map/' + default_tree['provinces'].val)
     a = np.array(Image.open(str(provinces_path)))
-    for i, j in np.ndindex(a.shape[0] - 1, a.shape[1] - 1):
-        province = rgb_id_map.get(tuple(a[i, j]))
-        if province in land_or_river:
-            province_graph.add_node(province)
-            if province in rivers:
-                rivers[province][0].append((i, j))
-            for coords in ((i, j + 1), (i + 1, j)):
-                neighbor = rgb_id_map.get(tuple(a[coords]))
-                if neighbor != province and neighbor in land_or_river:
-                    province_graph.add_edge(province, neighbor)
-                    if province in rivers and neighbor not in rivers:
-                        rivers[province][1].append(coords)
-                    if neighbor in rivers and province not in rivers:
-                        rivers[neighbor][1].append((i, j))
+    b, unknown = rgb_to_ids(a, rgb_id_map)
+    report_unknown_colors(a, unknown)
+    province_graph.add_nodes_from(
+        p for p in np.unique(b).tolist() if p in land_or_river)
+    for river, (river_px, _) in rivers.items():
+        river_px.extend(zip(*(x.tolist() for x in np.nonzero(b == river))))
+    edges, border_px_pairs = adjacencies(b, coords=True)
+    for (one, two), px_pairs in zip(edges.tolist(), border_px_pairs):
+        if one in land_or_river and two in land_or_river:
+            province_graph.add_edge(one, two)
+            # each row of px_pairs is a pixel of one, then the adjacent
+            # pixel of two
+            if one in rivers and two not in rivers:
+                rivers[one][1].extend(map(tuple, px_pairs[:, 2:].tolist()))
+            elif two in rivers and one not in rivers:
+                rivers[two][1].extend(map(tuple, px_pairs[:, :2].tolist()))
+    ids = b.tolist()
     river_adjacencies = defaultdict(set)
     for river, (river_px, border_px) in rivers.items():
         if not river_px:
@@ -72,12 +76,12 @@ def main():
                 if sqdist < min_val:
                     min_val = sqdist
                     min_item = i1, j1
-            px = a[min_item]
-            a[i0, j0] = px
-            province = rgb_id_map[tuple(px)]
-            for coords in [(i0 - 1, j0), (i0, j0 - 1),
+            i1, j1 = min_item
+            province = ids[i1][j1]
+            ids[i0][j0] = province
+            for i2, j2 in [(i0 - 1, j0), (i0, j0 - 1),
                            (i0, j0 + 1), (i0 + 1, j0)]:
-                neighbor = rgb_id_map.get(tuple(a[coords]))
+                neighbor = ids[i2][j2]
                 if (neighbor != province and neighbor in id_county_map and
                     not province_graph.has_edge(province, neighbor)):
                     if neighbor < province:
@@ -0,0 +1,92 @@
+# values which change at dates, like the liege, culture or religion of a
+# title. dates are (year, month, day) tuples and can be compared to the
+# EARLIEST_DATE and LATEST_DATE infinities of the scripts.
+
+from bisect import bisect_left, bisect_right
+import heapq
+
+class Timeline:
+    """the value of something from each date on, kept sorted by date
+
+    timeline[date] = value sets the value from date on until the next later
+    date, and at(date) is the value in effect at date, both by bisection.
+    """
+    __slots__ = 'dates', 'values'
+
+    def __init__(self, items=()):
+        self.dates = []
+        self.values = []
+        for date, value in items:
+            self[date] = value
+
+    def __setitem__(self, date, value):
+        i = bisect_left(self.dates, date)
+        if i < len(self.dates) and self.dates[i] == date:
+            self.values[i] = value
+        else:
+            self.dates.insert(i, date)
+            self.values.insert(i, value)
+
+    def __len__(self):
+        return len(self.dates)
+
+    def __iter__(self):
+        """iterate over the (date, value) change points in order"""
+        return zip(self.dates, self.values)
+
+    def at(self, when, default=None):
+        """return the value in effect at when, or default before the first
+        date"""
+        i = bisect_right(self.dates, when)
+        return self.values[i - 1] if i else default
+
+    def start(self, when, default=None):
+        """return the date from which the value at when is in effect"""
+        i = bisect_right(self.dates, when)
+        return self.dates[i - 1] if i else default
+
+    def next_date(self, when, default=None):
+        """return the first date after when, or default if there is none"""
+        i = bisect_right(self.dates, when)
+        return self.dates[i] if i < len(self.dates) else default
+
+    def changes(self, start=None, stop=None):
+        """iterate over the (date, value) change points with
+        start <= date < stop, where None means unbounded"""
+        lo = 0 if start is None else bisect_left(self.dates, start)
+        hi = len(self.dates) if stop is None else bisect_left(self.dates, stop)
+        return zip(self.dates[lo:hi], self.values[lo:hi])
+
+def values_at(timelines, when, default=None):
+    """return a dict of each key of the dict timelines to the value of its
+    timeline at when"""
+    return {key: timeline.at(when, default)
+            for key, timeline in timelines.items()}
+
+def change_dates(timelines):
+    """iterate over the distinct dates at which any of timelines changes,
+    in order"""
+    previous = None
+    for date in heapq.merge(*(timeline.dates for timeline in timelines)):
+        if date != previous:
+            yield date
+            previous = date
+
+def replay(ticks, dates, state, apply, snapshot):
+    """replay dated history once and take snapshots of it at several dates
+
+    ticks are (date, tick) pairs in any order. they are applied in date
+    order, ties in the given order, by apply(state, tick, date). return a
+    list with snapshot(state, date) for each of the ascending dates, taken
+    after all ticks up to and including that date were applied. snapshot
+    has to copy whatever it keeps of the mutable state.
+    """
+    ticks = sorted(ticks, key=lambda x: x[0])
+    result = []
+    i = 0
+    for date in dates:
+        while i < len(ticks) and ticks[i][0] <= date:
+            apply(state, ticks[i][1], ticks[i][0])
+            i += 1
+        result.append(snapshot(state, date))
+    return result
@@ -0,0 +1,26 @@
+from esc.ck2parser import SimpleParser
+
+
+def parse_save(tmp_path, text, subscriptions):
+    path = tmp_path / 'save.txt'
+    path.write_text(text)
+    return [(keys, value.str(SimpleParser()).split()) for keys, value
+            in SimpleParser().parse_save(path, subscriptions)]
+
+
+def test_list_object_before_subscribed_key(tmp_path):
+    text = 'provinces = { -1 = { { } cores = { A } } -2 = { cores = { B } } }'
+    assert parse_save(tmp_path, text, ['provinces/*/cores']) == [
+        (('provinces', '-1', 'cores'), ['{', 'A', '}']),
+        (('provinces', '-2', 'cores'), ['{', 'B', '}'])]
+
+
+def test_empty_list_object(tmp_path):
+    text = 'a = { { } b = 1 } c = 2'
+    assert parse_save(tmp_path, text, ['a/b']) == [(('a', 'b'), ['1'])]
+
+
+def test_nested_list_objects(tmp_path):
+    text = 'a = { { { z } } b = 1 } c = 2'
+    assert parse_save(tmp_path, text, ['a/b', 'c']) == [
+        (('a', 'b'), ['1']), (('c',), ['2'])]
@@ -0,0 +1,12 @@
+import numpy as np
+from esc.provincemap import ProvinceStats
+
+
+def test_terrain_of_high_ids():
+    # 4000 * 201 doesn't fit in the uint16 of the ids
+    ids = np.array([[0, 4000, 4000], [1, 4000, 2]], np.uint16)
+    terrain = np.array([[3, 35, 35], [200, 7, 0]], np.uint8)
+    stats = ProvinceStats(ids, terrain)
+    assert stats.terrain[4000] == 35
+    assert stats.terrain[[0, 1, 2]].tolist() == [3, 200, 0]
+    assert stats.terrain[3] == -1